@@ -1,40 +1,212 @@
+import asyncio
+import json
+from typing import List, Optional
+
+import numpy as np
 from fastapi import APIRouter
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.qa.task_classifier import classify_task
-from app.qa.answer_engine import generate_answer
-from app.rag.vector_store import LocalVectorStore
+from app.qa.task_classifier import classify_task, classify_task_local, uses_local_classifier
+from app.qa.answer_engine import generate_answer, generate_answer_stream
+from app.qa.answer_cache import answer_cache
+from app.rag.manual_registry import registry
+from app.core.config import ASK_BATCH_CONCURRENCY
 
 router = APIRouter(prefix="/ask", tags=["Ask"])
 
-# Loaded in main.py → initialized once at startup
-vector_store: LocalVectorStore | None = None
+NO_MANUAL_MESSAGE = "No manual uploaded yet. Please upload a PDF first."
 
 
 class QuestionRequest(BaseModel):
     question: str
+    # Folder name under app/data/processed; defaults to the last ingested manual
+    manual_id: Optional[str] = None
+
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[str]
+    manual_id: Optional[str] = None
+
+
+def _missing_manual_message(manual_id: Optional[str]) -> str:
+    if manual_id:
+        return f"Manual '{manual_id}' not found. Please upload or scrape it first."
+    return NO_MANUAL_MESSAGE
+
+
+async def _answer(manual_id: str, question: str, results: List[dict], question_vector: np.ndarray):
+    """
+    Intent + answer for already-retrieved chunks.
+    - semantic answer cache first
+    - local intent classifier: microseconds, reuses the retrieval embedding
+    - Gemini intent classifier: runs concurrently with generate_answer,
+      so it never adds a round-trip to the critical path
+    Returns (intent, answer, cached).
+    """
+    cached = answer_cache.lookup(manual_id, results, question_vector)
+    if cached is not None:
+        return cached["intent"], cached["answer"], True
+
+    if uses_local_classifier():
+        intent = classify_task_local(question, question_vector)
+        answer = await run_in_threadpool(generate_answer, question, results)
+    else:
+        intent, answer = await asyncio.gather(
+            run_in_threadpool(classify_task, question),
+            run_in_threadpool(generate_answer, question, results),
+        )
+
+    print(f"🧭 Detected intent: {intent}")
+    answer_cache.store(manual_id, results, question_vector, answer, intent)
+    return intent, answer, False
+
+
+@router.get("/manuals")
+def list_manuals():
+    """List every processed manual that can be queried."""
+    return {"manuals": registry.list_manuals()}
 
 
 @router.post("/")
-def ask_manual_question(req: QuestionRequest):
+async def ask_manual_question(req: QuestionRequest):
     """Answer a question using the icon-enriched RAG manual."""
-    global vector_store
+    manual_id = req.manual_id or registry.active_manual_id
+    vector_store = await run_in_threadpool(registry.get, manual_id)
 
     if vector_store is None:
-        return {"answer": "No manual uploaded yet. Please upload a PDF first."}
+        return {"answer": _missing_manual_message(req.manual_id)}
 
-    # 1. Detect task intent
-    intent = classify_task(req.question)
-    print(f"🧭 Detected intent: {intent}")
+    # 1. Embed once, retrieve top chunks with icons embedded (CPU work off the event loop)
+    question_vector = await run_in_threadpool(vector_store.embed_query, req.question)
+    results = await run_in_threadpool(vector_store.search, req.question, 5, question_vector)
 
-    # 2. Retrieve top chunks with icons embedded
-    results = vector_store.search(req.question, top_k=5)
-
-    # 3. Generate final LLM answer (icon-aware)
-    answer = generate_answer(req.question, results)
+    # 2. Intent + final LLM answer (icon-aware)
+    intent, answer, cached = await _answer(manual_id, req.question, results, question_vector)
 
     return {
+        "manual_id": manual_id,
         "intent": intent,
         "answer": answer,
+        "cached": cached,
         "chunks": results  # optional but useful for debugging
     }
+
+
+@router.post("/batch")
+async def ask_manual_questions_batch(req: BatchQuestionRequest):
+    """
+    Answer many questions at once (evaluation runs, bulk FAQ generation).
+    Retrieval for the whole batch is one encode call + one matrix product.
+    Repeated questions are retrieved and answered once.
+    """
+    manual_id = req.manual_id or registry.active_manual_id
+    vector_store = await run_in_threadpool(registry.get, manual_id)
+
+    if vector_store is None:
+        return {"answers": [], "error": _missing_manual_message(req.manual_id)}
+
+    if not req.questions:
+        return {"manual_id": manual_id, "answers": []}
+
+    # 1. Retrieve top chunks for every distinct question in one pass
+    questions = list(dict.fromkeys(req.questions))
+    question_vectors = await run_in_threadpool(vector_store.embed_queries, questions)
+    all_results = await run_in_threadpool(vector_store.search_many, questions, 5, question_vectors)
+
+    # 2. Classify + answer the questions concurrently (unless a near-duplicate is cached)
+    semaphore = asyncio.Semaphore(max(1, ASK_BATCH_CONCURRENCY))
+
+    async def answer_one(question: str, results: List[dict], question_vector: np.ndarray):
+        async with semaphore:
+            intent, answer, cached = await _answer(manual_id, question, results, question_vector)
+
+        return {
+            "question": question,
+            "intent": intent,
+            "answer": answer,
+            "cached": cached,
+            "chunks": results,
+        }
+
+    answers = await asyncio.gather(*(
+        answer_one(question, results, question_vector)
+        for question, results, question_vector in zip(questions, all_results, question_vectors)
+    ))
+
+    # 3. Back to the request's order, one answer per submitted question
+    by_question = dict(zip(questions, answers))
+    return {
+        "manual_id": manual_id,
+        "answers": [by_question[question] for question in req.questions],
+    }
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def ask_manual_question_stream(req: QuestionRequest):
+    """
+    Streaming /ask over server-sent events:
+    - event "chunks": retrieved chunk ids + scores, sent as soon as retrieval is done
+    - event "token":  answer text pieces as Gemini produces them
+    - event "done":   intent and whether the answer came from the cache
+    - event "error":  the manual is missing, or retrieval / generation failed
+    """
+    manual_id = req.manual_id or registry.active_manual_id
+
+    async def events():
+        # Every failure becomes an "error" event: once the response has
+        # started, an exception would only cut the stream off
+        intent_task = None
+        try:
+            vector_store = await run_in_threadpool(registry.get, manual_id)
+            if vector_store is None:
+                yield _sse("error", {"message": _missing_manual_message(req.manual_id)})
+                return
+
+            question_vector = await run_in_threadpool(vector_store.embed_query, req.question)
+            results = await run_in_threadpool(vector_store.search, req.question, 5, question_vector)
+
+            yield _sse("chunks", {
+                "manual_id": manual_id,
+                "chunks": [{"id": r["id"], "score": r["score"]} for r in results],
+            })
+
+            cached = answer_cache.lookup(manual_id, results, question_vector)
+            if cached is not None:
+                yield _sse("token", {"text": cached["answer"]})
+                yield _sse("done", {"intent": cached["intent"], "cached": True})
+                return
+
+            # Gemini classification (if enabled) runs while the answer streams
+            if uses_local_classifier():
+                intent = classify_task_local(req.question, question_vector)
+            else:
+                intent_task = asyncio.ensure_future(run_in_threadpool(classify_task, req.question))
+
+            pieces = []
+            async for text in iterate_in_threadpool(generate_answer_stream(req.question, results)):
+                pieces.append(text)
+                yield _sse("token", {"text": text})
+
+            if intent_task is not None:
+                intent = await intent_task
+
+            answer_cache.store(manual_id, results, question_vector, "".join(pieces), intent)
+            yield _sse("done", {"intent": intent, "cached": False})
+        except Exception as e:
+            if intent_task is not None:
+                intent_task.cancel()
+            print(f"⚠️ Streaming answer failed: {e}")
+            yield _sse("error", {"message": "Answering the question failed."})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,18 +1,30 @@
 import os
+import shutil
 import subprocess
+import tempfile
+import threading
 from pathlib import Path
+from urllib.parse import urlparse
 
 import requests
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
-from app.ingestion.process_pdf import process_pdf
-from app.rag.vector_store import LocalVectorStore
-import app.api.routers.ask_router as ask_router  # set active vector store
+from app.core.paths import MANUALS_DIR
+from app.ingestion.process_pdf import resolve_manual_id
+from app.rag.manual_registry import registry
+from app.services.ingest_jobs import JobConflictError, job_manager
 
 
 router = APIRouter(prefix="/scrape", tags=["Scraping"])
 
+# Scrapy runs share one downloads folder: run them one at a time
+_scrapy_lock = threading.Lock()
+
+# Direct downloads land in a fresh sub-folder of this one (never cleared by Scrapy runs)
+DIRECT_DOWNLOADS_DIR = "direct_pdfs"
+
 
 class ScrapeRequest(BaseModel):
     url: str  # URL returned from /search/manuals
@@ -46,16 +58,111 @@ def find_scrapy_root() -> Path:
     raise RuntimeError("Could not locate Scrapy project structure.")
 
 
+# ---------------------------------------------------------
+# Helper: Fetch a PDF (blocking, run in threadpool)
+# ---------------------------------------------------------
+def fetch_direct_pdf(manual_url: str) -> Path:
+    # Own folder per download: the spider clears downloaded_pdfs, and two
+    # direct downloads may share a file name
+    scrapy_root = find_scrapy_root()
+    direct_root = scrapy_root / DIRECT_DOWNLOADS_DIR
+    direct_root.mkdir(parents=True, exist_ok=True)
+    downloads_folder = Path(tempfile.mkdtemp(dir=direct_root))
+
+    # Keep the URL's file name: it becomes the manual_id
+    pdf_name = Path(urlparse(manual_url).path).name or "manual.pdf"
+    pdf_path = downloads_folder / pdf_name
+    try:
+        return download_pdf_direct(manual_url, pdf_path)
+    except Exception:
+        shutil.rmtree(downloads_folder, ignore_errors=True)
+        raise
+
+
+def fetch_manualsonline_pdf(manual_url: str) -> Path:
+    with _scrapy_lock:
+        return _run_manualsonline_spider(manual_url)
+
+
+def _run_manualsonline_spider(manual_url: str) -> Path:
+    spider_name = "manualsonline"
+
+    scrapy_project_root = find_scrapy_root()
+    scrapy_cwd = scrapy_project_root / "manuals_scraper"
+    downloads_folder = scrapy_project_root / "downloaded_pdfs"
+
+    downloads_folder.mkdir(parents=True, exist_ok=True)
+
+    # Clear old PDFs
+    for f in downloads_folder.glob("*.pdf"):
+        f.unlink()
+
+    # Run Scrapy
+    result = subprocess.run(
+        [
+            "scrapy",
+            "crawl",
+            spider_name,
+            "-a",
+            f"start_url={manual_url}",
+        ],
+        cwd=scrapy_cwd,
+        capture_output=True,
+        text=True,
+    )
+
+    if result.returncode != 0:
+        print(result.stdout)
+        print(result.stderr)
+        raise HTTPException(500, "Scrapy failed. Check backend logs.")
+
+    # Look for the PDF
+    pdf_files = sorted(downloads_folder.glob("*.pdf"))
+    if not pdf_files:
+        raise HTTPException(404, "Scrapy finished but no PDF downloaded.")
+
+    latest_pdf = pdf_files[-1]
+    print(f"[SCRAPE] Using downloaded PDF: {latest_pdf}")
+    return latest_pdf
+
+
+# ---------------------------------------------------------
+# Helper: Queue ingestion of a fetched PDF
+# ---------------------------------------------------------
+def queue_ingestion(pdf_path: Path, manual_url: str):
+    # Move out of the download folder: the next scrape clears it,
+    # possibly before this job's worker has read the file
+    stored_pdf = MANUALS_DIR / pdf_path.name
+    metadata = {"source_url": manual_url}
+
+    try:
+        # Refuse before replacing a PDF a running job is still reading
+        with job_manager.reserve(resolve_manual_id(str(stored_pdf), metadata)):
+            pdf_path.replace(stored_pdf)
+            return job_manager.submit(
+                str(stored_pdf),
+                metadata=metadata,
+                on_success=registry.activate,
+            )
+    except JobConflictError as e:
+        raise HTTPException(409, str(e))
+    finally:
+        if pdf_path.parent.parent.name == DIRECT_DOWNLOADS_DIR:
+            shutil.rmtree(pdf_path.parent, ignore_errors=True)
+
+
 # ---------------------------------------------------------
 # Main endpoint
 # ---------------------------------------------------------
-@router.post("/manual")
+@router.post("/manual", status_code=202)
 async def scrape_manual(req: ScrapeRequest):
     """
     New Unified Scrape Logic:
     1) If URL ends with .pdf → download directly (Google-Fu mode)
     2) Else if URL from ManualOnline → use Scrapy spider
     3) Else → reject
+    The PDF is fetched off the event loop, then ingestion is queued as a
+    background job; poll GET /ingest/jobs/{job_id} for progress.
     """
 
     manual_url = req.url.strip()
@@ -70,36 +177,15 @@ async def scrape_manual(req: ScrapeRequest):
     if url_lower.endswith(".pdf"):
         print("[SCRAPE] Mode: DIRECT PDF")
 
-        # Create downloads folder
-        scrapy_root = find_scrapy_root()
-        downloads_folder = scrapy_root / "downloaded_pdfs"
-        downloads_folder.mkdir(parents=True, exist_ok=True)
-
-        # Clean old PDFs
-        for f in downloads_folder.glob("*.pdf"):
-            f.unlink()
-
-        pdf_path = downloads_folder / "manual.pdf"
-        download_pdf_direct(manual_url, pdf_path)
-
-        # Process PDF with RAG pipeline
-        rag_dir = process_pdf(
-            str(pdf_path),
-            metadata={"source_url": manual_url},
-        )
-
-        # Load vector store
-        rag_json = Path(rag_dir) / "rag_chunks_with_embeddings.json"
-        if not rag_json.exists():
-            raise HTTPException(500, f"Missing RAG file: {rag_json}")
-
-        ask_router.vector_store = LocalVectorStore(str(rag_json))
+        pdf_path = await run_in_threadpool(fetch_direct_pdf, manual_url)
+        job = queue_ingestion(pdf_path, manual_url)
 
         return {
-            "message": "PDF downloaded & processed successfully.",
+            "message": "PDF downloaded, ingestion queued.",
             "scraped_url": manual_url,
             "pdf": pdf_path.name,
-            "rag_dir": rag_dir,
+            "job_id": job.id,
+            "manual_id": job.manual_id,
             "mode": "direct_pdf",
         }
 
@@ -109,63 +195,15 @@ async def scrape_manual(req: ScrapeRequest):
     if "manualsonline.com" in url_lower:
         print("[SCRAPE] Mode: MANUALONLINE SCRAPING")
 
-        spider_name = "manualsonline"
-
-        scrapy_project_root = find_scrapy_root()
-        scrapy_cwd = scrapy_project_root / "manuals_scraper"
-        downloads_folder = scrapy_project_root / "downloaded_pdfs"
-
-        downloads_folder.mkdir(parents=True, exist_ok=True)
-
-        # Clear old PDFs
-        for f in downloads_folder.glob("*.pdf"):
-            f.unlink()
-
-        # Run Scrapy
-        result = subprocess.run(
-            [
-                "scrapy",
-                "crawl",
-                spider_name,
-                "-a",
-                f"start_url={manual_url}",
-            ],
-            cwd=scrapy_cwd,
-            capture_output=True,
-            text=True,
-        )
-
-        if result.returncode != 0:
-            print(result.stdout)
-            print(result.stderr)
-            raise HTTPException(500, "Scrapy failed. Check backend logs.")
-
-        # Look for the PDF
-        pdf_files = sorted(downloads_folder.glob("*.pdf"))
-        if not pdf_files:
-            raise HTTPException(404, "Scrapy finished but no PDF downloaded.")
-
-        latest_pdf = pdf_files[-1]
-        print(f"[SCRAPE] Using downloaded PDF: {latest_pdf}")
-
-        # Process PDF with RAG pipeline
-        rag_dir = process_pdf(
-            str(latest_pdf),
-            metadata={"source_url": manual_url},
-        )
-
-        # Load vector store
-        rag_json = Path(rag_dir) / "rag_chunks_with_embeddings.json"
-        if not rag_json.exists():
-            raise HTTPException(500, f"Missing RAG file: {rag_json}")
-
-        ask_router.vector_store = LocalVectorStore(str(rag_json))
+        latest_pdf = await run_in_threadpool(fetch_manualsonline_pdf, manual_url)
+        job = queue_ingestion(latest_pdf, manual_url)
 
         return {
-            "message": "ManualOnline manual scraped & processed successfully.",
+            "message": "ManualOnline manual scraped, ingestion queued.",
             "scraped_url": manual_url,
             "pdf": latest_pdf.name,
-            "rag_dir": rag_dir,
+            "job_id": job.id,
+            "manual_id": job.manual_id,
             "mode": "scrapy_manualonline",
         }
 
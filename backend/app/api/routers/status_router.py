@@ -1,11 +1,101 @@
-from fastapi import APIRouter
-from app.rag.utils.progress import PROGRESS_FILE
+import asyncio
 import json
+import time
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.rag.utils.progress import progress_tracker
+from app.rag.embedder import get_embedder
+from app.qa.answer_cache import answer_cache
+from app.services.ingest_jobs import FINISHED, job_manager
 
 router = APIRouter(prefix="/ingest", tags=["Ingest Status"])
 
+# Progress streams poll the tracker on the event loop (no threadpool worker held)
+STREAM_POLL_SECONDS = 0.25
+STREAM_HEARTBEAT_SECONDS = 5.0
+
 @router.get("/status")
 def get_ingest_status():
-    if PROGRESS_FILE.exists():
-        return json.loads(PROGRESS_FILE.read_text())
-    return {"phase": "idle", "progress": 0}
+    """Progress of the most recent ingestion job (see /ingest/jobs for all of them)."""
+    jobs = job_manager.list()
+    if not jobs:
+        return {"phase": "idle", "progress": 0}
+    return get_job_status(jobs[0].id)
+
+
+@router.get("/status/{job_id}")
+def get_job_status(job_id: str):
+    """Per-stage progress (done/total, throughput, ETA) of one ingestion job."""
+    job = job_manager.get(job_id)
+    snapshot = progress_tracker.snapshot(job_id)
+    if job is None or snapshot is None:
+        raise HTTPException(404, f"Unknown job: {job_id}")
+    return {**snapshot, "status": job.status, "manual_id": job.manual_id}
+
+
+@router.get("/status/{job_id}/stream")
+async def stream_job_status(job_id: str):
+    """
+    Server-sent events: one "progress" event whenever the job's progress
+    changes (at least every 5s as a heartbeat), then a final "done" event.
+    """
+    get_job_status(job_id)  # 404 early for unknown jobs
+
+    async def events():
+        version = None
+        while True:
+            status = get_job_status(job_id)
+            if status["version"] != version:
+                version = status["version"]
+                yield f"event: progress\ndata: {json.dumps(status)}\n\n"
+
+            if status["status"] in FINISHED:
+                yield f"event: done\ndata: {json.dumps(status)}\n\n"
+                return
+
+            deadline = time.monotonic() + STREAM_HEARTBEAT_SECONDS
+            while progress_tracker.version(job_id) == version and time.monotonic() < deadline:
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/query-cache")
+def get_query_cache_stats():
+    """Hit/miss counters of the query embedding cache."""
+    return get_embedder().query_cache.stats()
+
+
+@router.get("/answer-cache")
+def get_answer_cache_stats():
+    """Hit/miss counters of the semantic answer cache."""
+    return answer_cache.stats()
+
+
+@router.get("/jobs")
+def list_ingest_jobs():
+    """All ingestion jobs of this process, newest first."""
+    return {"jobs": [job.to_dict() for job in job_manager.list()]}
+
+
+@router.get("/jobs/{job_id}")
+def get_ingest_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown job: {job_id}")
+    return job.to_dict()
+
+
+@router.delete("/jobs/{job_id}")
+def cancel_ingest_job(job_id: str):
+    """Cancel a queued job, or terminate its worker process if running."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown job: {job_id}")
+    return job.to_dict()
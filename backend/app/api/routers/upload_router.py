@@ -1,10 +1,9 @@
-from fastapi import APIRouter, UploadFile, File
-from pathlib import Path
+from fastapi import APIRouter, UploadFile, File, HTTPException
 import shutil
 
-import app.api.routers.ask_router as ask_router
-from app.ingestion.pipeline.full_ingest import run_full_ingestion
-from app.rag.vector_store import LocalVectorStore
+from app.rag.manual_registry import registry
+from app.ingestion.process_pdf import resolve_manual_id
+from app.services.ingest_jobs import JobConflictError, job_manager
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
@@ -19,27 +18,35 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
 
-@router.post("/")
-async def upload_manual(file: UploadFile = File(...)):
-    """Upload a manual and run icon-aware ingestion."""
+@router.post("/", status_code=202)
+def upload_manual(file: UploadFile = File(...)):
+    """
+    Upload a manual and queue icon-aware ingestion.
+    Returns immediately; poll GET /ingest/jobs/{job_id} for progress.
+    Plain def: FastAPI runs it in the threadpool, so the blocking copy
+    below does not stall the event loop.
+    """
 
-    # 1. Save uploaded file
     file_path = UPLOAD_DIR / file.filename
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
 
-    # 2. Prepare output folder inside app/data/processed
-    manual_name = file.filename.replace(".pdf", "")
-    output_dir = PROCESSED_DIR / manual_name
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # 3. Run ingestion
-    run_full_ingestion(str(file_path), str(output_dir))
-
-    # 4. Load vector store
-    rag_file = output_dir / "rag_chunks_with_embeddings.json"
-    vs = LocalVectorStore(str(rag_file))
-
-    ask_router.vector_store = vs
-
-    return {"message": "Manual uploaded and ingested successfully."}
+    try:
+        # Refuse before overwriting a PDF a running job is still reading
+        with job_manager.reserve(resolve_manual_id(str(file_path))):
+            # 1. Save uploaded file
+            with open(file_path, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+
+            # 2. Queue ingestion into app/data/processed/<manual_id>
+            job = job_manager.submit(
+                str(file_path),
+                output_root=str(PROCESSED_DIR),
+                on_success=registry.activate,
+            )
+    except JobConflictError as e:
+        raise HTTPException(409, str(e))
+
+    return {
+        "message": "Manual uploaded, ingestion queued.",
+        "job_id": job.id,
+        "manual_id": job.manual_id,
+    }
@@ -26,6 +26,21 @@ print("🚀 Using Gemini API")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
+# How EMBEDDING_MODEL is run (all CPU-friendly):
+# "torch"      = SentenceTransformer, fp32
+# "torch-int8" = SentenceTransformer with dynamically int8-quantized Linear layers
+# "onnx"       = onnxruntime + tokenizers on an exported model, torch is never imported
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ONNX_PATH = os.getenv("EMBEDDING_ONNX_PATH", "")  # empty = app/data/models/<model>-onnx
+EMBEDDING_MAX_LENGTH = int(os.getenv("EMBEDDING_MAX_LENGTH", 256))  # tokens (onnx backend)
+
+# "local"  = nearest-centroid over MiniLM embeddings (no LLM call)
+# "gemini" = Gemini call, run concurrently with answer generation
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "local").lower()
+
+# /ask/batch: questions answered concurrently (Gemini calls in flight)
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", 4))
+
 # --------------------------------------------
 # RAG settings
 # --------------------------------------------
@@ -33,6 +48,109 @@ TOP_K_RESULTS = int(os.getenv("TOP_K_RESULTS", 3))
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 200))
 
+# --------------------------------------------
+# Chunk embedding (ingestion)
+# --------------------------------------------
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 0))  # 0 = auto-tune by throughput
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", 256))  # upper bound for auto-tuning
+# >1 = embed in a pool of worker processes (0 = one per CPU core, 1 = in-process)
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 1))
+EMBED_THREADS_PER_WORKER = int(os.getenv("EMBED_THREADS_PER_WORKER", 1))  # torch threads per pool worker
+# Also write rag_chunks_with_embeddings.json (vectors as JSON text);
+# every reader uses the binary store, so this is only for external tools
+WRITE_LEGACY_JSON = int(os.getenv("WRITE_LEGACY_JSON", 0))
+
+# --------------------------------------------
+# Vector index settings (FAISS, optional)
+# --------------------------------------------
+# "numpy" = brute-force numpy scoring, no index file
+# "flat"  = exact IndexFlatIP
+# "ivf"   = IndexIVFFlat (approximate, fast on large corpora)
+# "hnsw"  = IndexHNSWFlat (approximate, graph-based)
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "numpy").lower()
+IVF_NLIST = int(os.getenv("IVF_NLIST", 0))  # 0 = auto (~4 * sqrt(N))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 8))
+HNSW_M = int(os.getenv("HNSW_M", 32))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", 64))
+
+# --------------------------------------------
+# Vector storage (numpy search path)
+# --------------------------------------------
+# What LocalVectorStore keeps in RAM for scoring (embeddings.npy always stays on disk):
+# "float32" = the memory-mapped exact matrix (4 bytes/dim)
+# "float16" = half-precision copy (2 bytes/dim)
+# "int8"    = scalar-quantized codes + per-row scale (~1 byte/dim)
+# "pq"      = product-quantization codes (1 byte per subvector)
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "float32").lower()
+PQ_SUBVECTORS = int(os.getenv("PQ_SUBVECTORS", 48))  # 384-d MiniLM → 8 dims per code
+# Best approximate candidates re-scored against the exact float32 rows (0 = off)
+VECTOR_RERANK = int(os.getenv("VECTOR_RERANK", 64))
+
+# --------------------------------------------
+# Manual registry (multi-manual serving)
+# --------------------------------------------
+# Loaded vector stores are evicted least-recently-used first
+# once their combined size exceeds this budget
+MANUAL_CACHE_MB = int(os.getenv("MANUAL_CACHE_MB", 1024))
+
+# --------------------------------------------
+# PDF page rendering
+# --------------------------------------------
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", 0))  # 0 = one per CPU core, 1 = serial
+# 1 = render pages in memory and detect icons directly (no page PNGs),
+# 0 = legacy path: write page PNGs, then detect from disk
+PAGE_STREAMING = int(os.getenv("PAGE_STREAMING", 1))
+# Also write page PNGs in streaming mode (debugging)
+SAVE_PAGE_IMAGES = int(os.getenv("SAVE_PAGE_IMAGES", 0))
+
+# Icon candidate detection (streaming mode):
+# "raster" = threshold + contours on the full rendered page (default)
+# "vector" = embedded images + vector drawing clusters from the PDF itself
+# "auto"   = vector for born-digital pages, raster for scanned pages
+# "vector" / "auto" are opt-in: they find different candidates than raster
+ICON_DETECTOR = os.getenv("ICON_DETECTOR", "raster").lower()
+VECTOR_ICON_DPI = int(os.getenv("VECTOR_ICON_DPI", 300))  # clip render resolution
+
+# --------------------------------------------
+# Icon classification (Gemini Vision)
+# --------------------------------------------
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", 15))  # request quota per minute (free tier: 15)
+ICON_BATCH_SIZE = int(os.getenv("ICON_BATCH_SIZE", 8))  # icons packed into one request
+ICON_CLASSIFY_CONCURRENCY = int(os.getenv("ICON_CLASSIFY_CONCURRENCY", 4))  # requests in flight
+ICON_MAX_RETRIES = int(os.getenv("ICON_MAX_RETRIES", 5))  # retries on 429 only
+ICON_BACKOFF_SECONDS = float(os.getenv("ICON_BACKOFF_SECONDS", 2.0))  # first 429 backoff, doubles
+
+# Classification cache shared across manuals, keyed by perceptual hash
+ICON_CACHE = int(os.getenv("ICON_CACHE", 1))  # 0 disables the cache
+ICON_CACHE_PATH = os.getenv("ICON_CACHE_PATH", "")  # SQLite file, empty = app/data/icon_cache.sqlite3
+ICON_CACHE_MAX_DISTANCE = int(os.getenv("ICON_CACHE_MAX_DISTANCE", 4))  # Hamming bits for a hit
+
+# --------------------------------------------
+# Background ingestion jobs
+# --------------------------------------------
+INGEST_MAX_CONCURRENT = int(os.getenv("INGEST_MAX_CONCURRENT", 1))  # worker processes at once
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", 100))  # finished jobs kept for /ingest/jobs
+# Re-ingesting a manual only redoes what changed: pages keep their icons and
+# chunks their vectors when their content hash matches ingest_manifest.json
+# in the processed folder; an unchanged PDF is skipped. 0 = always rebuild
+INCREMENTAL_INGEST = int(os.getenv("INCREMENTAL_INGEST", 1))
+
+# --------------------------------------------
+# Query embedding cache
+# --------------------------------------------
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 4096))  # 0 disables the cache
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", 0))  # seconds, 0 = never expire
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "")  # .npz file, empty = memory only
+
+# --------------------------------------------
+# Semantic answer cache
+# --------------------------------------------
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 2048))  # 0 disables the cache
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 86400))  # seconds, 0 = never expire
+ANSWER_CACHE_POLICY = os.getenv("ANSWER_CACHE_POLICY", "lru").lower()  # "lru" or "fifo"
+# Minimum cosine similarity between questions for a cached answer to be reused
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.92))
+
 # --------------------------------------------
 # Web scrapping settings
 # --------------------------------------------
\ No newline at end of file
@@ -0,0 +1,190 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from app.core.config import ICON_CACHE, ICON_CACHE_PATH, ICON_CACHE_MAX_DISTANCE
+from app.core.paths import DATA_DIR
+from app.ingestion.icon_processing.icon_deduplicator import hamming_distances, hash_to_int
+
+
+def _to_signed(h: int) -> int:
+    """SQLite INTEGER is signed 64-bit."""
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+class IconClassificationCache:
+    """
+    Persistent icon classification cache shared by every manual.
+
+    Keyed by the icon's 64-bit perceptual hash: a lookup returns the stored
+    result of the closest hash within max_distance bits, so the same symbol
+    cropped from another PDF (slightly different scale / anti-aliasing)
+    still hits. Negative results (TEXT / NOISE) are cached too.
+    Entries are scoped by Gemini model + schema version (prompt / response
+    schema): results of another model or prompt are never returned.
+
+    Storage is one SQLite file (WAL mode, so concurrent ingestion workers
+    can read and write it). All hashes are kept in a uint64 array and
+    matched with a vectorized XOR + popcount.
+    """
+
+    def __init__(self, path: str, max_distance: int = 4):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_distance = max_distance
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+        # Files from before model/schema scoping: their entries cannot be
+        # attributed to a prompt version, start over
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(icon_classifications)")}
+        if columns and "schema" not in columns:
+            self._conn.execute("DROP TABLE icon_classifications")
+
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS icon_classifications (
+                phash       INTEGER NOT NULL,
+                model       TEXT NOT NULL,
+                schema      TEXT NOT NULL,
+                kind        TEXT NOT NULL,
+                label       TEXT,
+                meaning     TEXT,
+                description TEXT,
+                confidence  REAL,
+                created     REAL,
+                PRIMARY KEY (phash, model, schema)
+            )
+            """
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def _load(self) -> None:
+        """(model, schema) → uint64 array of cached hashes."""
+        hashes: Dict[Tuple[str, str], list] = {}
+        for phash, model, schema in self._conn.execute("SELECT phash, model, schema FROM icon_classifications"):
+            hashes.setdefault((model, schema), []).append(phash)
+        self._hashes = {
+            scope: np.array(values, dtype=np.int64).view(np.uint64)
+            for scope, values in hashes.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(len(h) for h in self._hashes.values())
+
+    def lookup(self, phash, model: str, schema: str) -> Dict | None:
+        """
+        phash: hex string or int; model / schema: the classifier's Gemini
+        model and prompt/schema version.
+        Returns {"kind", "label", "meaning", "description", "confidence",
+        "distance"} for the closest cached hash, or None.
+        """
+        h = hash_to_int(phash) if isinstance(phash, str) else int(phash)
+
+        with self._lock:
+            hashes = self._hashes.get((model, schema))
+            if hashes is None or not len(hashes):
+                self.misses += 1
+                return None
+
+            distances = hamming_distances(hashes, h)
+            best = int(np.argmin(distances))
+            distance = int(distances[best])
+            if distance > self.max_distance:
+                self.misses += 1
+                return None
+
+            row = self._conn.execute(
+                "SELECT kind, label, meaning, description, confidence "
+                "FROM icon_classifications WHERE phash = ? AND model = ? AND schema = ?",
+                (_to_signed(int(hashes[best])), model, schema),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        kind, label, meaning, description, confidence = row
+        return {
+            "kind": kind,
+            "label": label,
+            "meaning": meaning,
+            "description": description,
+            "confidence": confidence,
+            "distance": distance,
+        }
+
+    def store_many(self, entries: Iterable[tuple], model: str, schema: str) -> None:
+        """entries: (phash, {"kind", "label", "meaning", "description", "confidence"})"""
+        now = time.time()
+        rows = [
+            (
+                _to_signed(hash_to_int(phash) if isinstance(phash, str) else int(phash)),
+                model,
+                schema,
+                str(result.get("kind", "ICON")).upper(),
+                result.get("label"),
+                result.get("meaning"),
+                result.get("description"),
+                result.get("confidence"),
+                now,
+            )
+            for phash, result in entries
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO icon_classifications "
+                "(phash, model, schema, kind, label, meaning, description, confidence, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            # Also picks up entries written by other workers meanwhile
+            self._load()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": sum(len(h) for h in self._hashes.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "max_distance": self.max_distance,
+                "path": str(self.path),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Opened lazily: one connection per (worker) process
+_icon_cache: IconClassificationCache | None = None
+
+
+def get_icon_cache() -> IconClassificationCache | None:
+    """Process-wide icon cache, or None when ICON_CACHE=0."""
+    global _icon_cache
+    if not ICON_CACHE:
+        return None
+    if _icon_cache is None:
+        _icon_cache = IconClassificationCache(
+            ICON_CACHE_PATH or str(DATA_DIR / "icon_cache.sqlite3"),
+            max_distance=ICON_CACHE_MAX_DISTANCE,
+        )
+    return _icon_cache
@@ -1,10 +1,23 @@
+import asyncio
+import hashlib
 import json
+import random
 import time
 from pathlib import Path
-import cv2
-import numpy as np
 
 import google.generativeai as genai
+from google.api_core.exceptions import ResourceExhausted
+
+from app.core.config import (
+    GEMINI_RPM,
+    ICON_BATCH_SIZE,
+    ICON_CLASSIFY_CONCURRENCY,
+    ICON_MAX_RETRIES,
+    ICON_BACKOFF_SECONDS,
+)
+from app.ingestion.icon_processing.icon_cache import IconClassificationCache
+from app.ingestion.icon_processing.icon_features import compute_icon_features_from_file, is_text_like
+from app.rag.utils.progress import stage_start, stage_advance, stage_done
 
 
 # ============================================
@@ -14,81 +27,219 @@ import google.generativeai as genai
 def is_probably_text(img_path: str) -> bool:
     """
     Heuristic to remove text fragments before Gemini is called.
+    Reads the crop from disk; clusters from deduplicate_icons carry
+    precomputed features, checked with is_text_like instead.
     """
-    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-    if img is None:
-        return True
+    return is_text_like(compute_icon_features_from_file(img_path))
 
-    h, w = img.shape
 
-    # Very small images = likely text/noise
-    if w < 25 or h < 20:
-        return True
+# ============================================
+# 2. Gemini prompts (one request = several images)
+# ============================================
 
-    # Text-like aspect ratios
-    aspect = w / h
-    if aspect > 5.0 or aspect < 0.2:
-        return True
+ICON_CLASSIFY_PROMPT = """
+You are a domain expert for appliance manuals.
+You will receive {count} images, numbered 1 to {count}.
 
-    # Black pixel ratio (text is thin)
-    thresh = cv2.threshold(img, 200, 255, cv2.THRESH_BINARY_INV)[1]
-    black_ratio = np.sum(thresh > 0) / (h * w)
+For each image, in image order, set "kind":
+- ICON  = a REAL appliance icon
+- TEXT  = a text fragment
+- NOISE = anything else (lines, diagram parts, artifacts)
 
-    if black_ratio < 0.03:
-        return True
-    if black_ratio < 0.12:
-        return True
+For ICON fill in label, meaning, description and confidence (0.0-1.0).
+For TEXT and NOISE leave label, meaning and description empty and
+set confidence to 0.0.
+"""
 
-    return False
+# Structured output: Gemini must answer with exactly this shape
+ICON_RESULT_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "kind": {"type": "STRING", "format": "enum", "enum": ["ICON", "TEXT", "NOISE"]},
+            "label": {"type": "STRING"},
+            "meaning": {"type": "STRING"},
+            "description": {"type": "STRING"},
+            "confidence": {"type": "NUMBER"},
+        },
+        "required": ["kind", "label", "meaning", "description", "confidence"],
+    },
+}
+
+# Scopes the icon cache: editing the prompt or schema retires old entries
+ICON_SCHEMA_VERSION = hashlib.sha1(
+    (ICON_CLASSIFY_PROMPT + json.dumps(ICON_RESULT_SCHEMA, sort_keys=True)).encode("utf-8")
+).hexdigest()[:12]
 
 
 # ============================================
-# 2. Gemini prompts
+# 3. Rate limiting
 # ============================================
 
-ICON_DETECT_PROMPT = """
-You must determine if the image is a REAL appliance icon
-or just TEXT/NOISE.
+class TokenBucket:
+    """
+    Async token bucket shared by all in-flight requests.
+    Refills at requests_per_minute; every 429 halves the rate, every
+    success creeps it back up towards the configured quota.
+    """
 
-Output ONLY one word:
-ICON
-TEXT
-NOISE
-"""
+    def __init__(self, requests_per_minute: int, capacity: int = 1):
+        self.max_rate = max(1, requests_per_minute) / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
 
-ICON_CLASSIFY_PROMPT = """
-You are a domain expert for appliance manuals.
-Classify ONLY REAL appliance icons.
-
-Return STRICT JSON:
-{
-  "label": "...",
-  "meaning": "...",
-  "description": "...",
-  "confidence": 0.0
-}
-"""
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def slow_down(self):
+        self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def recover(self):
+        self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+def _parse_json_array(text: str, count: int) -> list:
+    items = json.loads(text)
+    if not isinstance(items, list) or len(items) != count:
+        raise ValueError(f"Expected a JSON array of {count} items, got: {text[:200]}")
+    return items
 
 
 # ============================================
-# 3. New Batch Classifier
+# 4. Batch Classifier
 # ============================================
 
 class IconClassifierBatched:
-    def __init__(self, api_key: str, model_name: str):
+    """
+    Classifies cluster representatives with Gemini Vision:
+    - up to batch_size icons are packed into one multimodal request
+    - one structured-output call per request returns kind (ICON / TEXT /
+      NOISE) and the classification together
+    - requests run concurrently (ICON_CLASSIFY_CONCURRENCY) behind a
+      token bucket driven by GEMINI_RPM
+    - 429 (ResourceExhausted) is retried with exponential backoff;
+      any other error fails only that batch
+    - with a cache, representatives whose phash is already known (from
+      any manual) never reach the API, and new results are written back
+    """
+
+    def __init__(self, api_key: str, model_name: str, cache: IconClassificationCache | None = None):
+        self.model_name = model_name
+        self.cache = cache
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(
             model_name=model_name,
-            generation_config={"temperature": 0}
+            generation_config={
+                "temperature": 0,
+                "response_mime_type": "application/json",
+                "response_schema": ICON_RESULT_SCHEMA,
+            }
         )
 
-    def classify_clusters(self, clusters_path: str, output_path: str, batch_size=10):
+    async def _generate(self, parts, bucket: TokenBucket) -> str:
+        for attempt in range(ICON_MAX_RETRIES + 1):
+            await bucket.acquire()
+            try:
+                resp = await self.model.generate_content_async(
+                    parts,
+                    safety_settings={"HARASSMENT": "BLOCK_NONE"}
+                )
+                bucket.recover()
+                return resp.text
+            except ResourceExhausted:
+                if attempt == ICON_MAX_RETRIES:
+                    raise
+                bucket.slow_down()
+                delay = ICON_BACKOFF_SECONDS * 2 ** attempt
+                print(f"⏳ Rate limited (429), retrying in ~{delay:.0f}s...")
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+
+    @staticmethod
+    def _batch_parts(prompt: str, images):
+        parts = [prompt.format(count=len(images))]
+        for number, img_bytes in enumerate(images, start=1):
+            parts.append(f"Image {number}:")
+            parts.append({"mime_type": "image/png", "data": img_bytes})
+        return parts
+
+    async def _classify_batch(self, paths, bucket: TokenBucket):
+        """
+        Classify one batch of representatives in a single structured-output
+        request → {path: {"kind", "label", ...}} (empty if the request failed).
+        """
+        images = [Path(p).read_bytes() for p in paths]
+
+        try:
+            items = _parse_json_array(
+                await self._generate(self._batch_parts(ICON_CLASSIFY_PROMPT, images), bucket),
+                len(paths),
+            )
+        except Exception as e:
+            print(f"⚠️ Icon classification failed for {len(paths)} icons: {e}")
+            return {}
+
+        results = {}
+        for path, data in zip(paths, items):
+            if not isinstance(data, dict):
+                continue
+            results[path] = {
+                "kind": str(data.get("kind", "NOISE")).upper(),
+                "label": data.get("label") or "unknown",
+                "meaning": data.get("meaning") or "unknown",
+                "description": data.get("description", ""),
+                "confidence": data.get("confidence", 0.0)
+            }
+        return results
+
+    async def _classify_all(self, paths, batch_size: int):
+        bucket = TokenBucket(GEMINI_RPM, capacity=ICON_CLASSIFY_CONCURRENCY)
+        slots = asyncio.Semaphore(max(1, ICON_CLASSIFY_CONCURRENCY))
+
+        async def run(batch):
+            async with slots:
+                results = await self._classify_batch(batch, bucket)
+            stage_advance("classify", len(batch))
+            return results
+
+        batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+        merged = {}
+        for results in await asyncio.gather(*(run(batch) for batch in batches)):
+            merged.update(results)
+        return merged
+
+    def classify_clusters(self, clusters_path: str, output_path: str, batch_size=ICON_BATCH_SIZE):
         """
         clusters_path = json with:
         [
           {
             "hash": "...",
-            "files": ["path1.png", "path2.png"]
+            "files": ["path1.png", "path2.png"],
+            "features": {...}
+          },
+          ...
+        ]
+
+        output_path = json consumed by generate_icon_token_map:
+        [
+          {
+            "cluster_id": 0,
+            "representative": "path1.png",
+            "files": [...],
+            "classification": {"label", "meaning", "description", "confidence"}
           },
           ...
         ]
@@ -96,65 +247,72 @@ class IconClassifierBatched:
 
         clusters = json.loads(Path(clusters_path).read_text())
 
-        # We classify only the representative (first file)
-        icon_paths = [c["files"][0] for c in clusters]
+        print(f"📦 Classifying {len(clusters)} icon clusters...")
+        print(f"🔹 {batch_size} icons/request, {ICON_CLASSIFY_CONCURRENCY} in flight, {GEMINI_RPM} RPM")
 
-        final_results = []
+        stage_start("classify", total=len(clusters), unit="icons")
 
-        print(f"📦 Classifying {len(icon_paths)} icon clusters...")
-        print(f"🔹 Using batch_size={batch_size} (Free Tier safe)")
-
-        for start in range(0, len(icon_paths), batch_size):
-            batch = icon_paths[start:start + batch_size]
-            print(f"\n➡️ Batch {start // batch_size + 1} → {len(batch)} icons")
-
-            # Process each icon in batch
-            for img_path in batch:
-
-                # 1) Heuristic first
-                if is_probably_text(img_path):
-                    continue
-
-                img_bytes = Path(img_path).read_bytes()
-
-                # 2) Check if real icon
-                try:
-                    detect_resp = self.model.generate_content(
-                        [ICON_DETECT_PROMPT, img_bytes],
-                        safety_settings={"HARASSMENT": "BLOCK_NONE"}
-                    )
-                    tag = detect_resp.text.strip().upper()
-                except:
-                    tag = "NOISE"
-
-                if tag != "ICON":
-                    continue
-
-                # 3) Full classification
-                try:
-                    classify_resp = self.model.generate_content(
-                        [ICON_CLASSIFY_PROMPT, img_bytes],
-                        safety_settings={"HARASSMENT": "BLOCK_NONE"}
-                    )
-                    data = json.loads(classify_resp.text)
-                except:
-                    data = {
-                        "label": "unknown",
-                        "meaning": "unknown",
-                        "description": "Failed to classify",
-                        "confidence": 0.0
-                    }
-
-                final_results.append({
-                    "path": img_path,
-                    "label": data.get("label", "unknown"),
-                    "meaning": data.get("meaning", "unknown"),
-                    "description": data.get("description", ""),
-                    "confidence": data.get("confidence", 0.0)
-                })
-
-            print("⏳ Cooldown 10 seconds to avoid rate limits...")
-            time.sleep(10)
+        # We classify only the representative (first file):
+        # 1) heuristic (precomputed features, no image read)
+        # 2) shared classification cache (no API call)
+        # 3) Gemini for the rest
+        classified = {}
+        candidates = []
+        hashes = {}
+        for cluster in clusters:
+            path = cluster["files"][0]
+            if "features" in cluster:
+                text_like = is_text_like(cluster["features"])
+            else:
+                text_like = is_probably_text(path)
+
+            if text_like:
+                stage_advance("classify")
+                continue
+
+            hit = None
+            if self.cache is not None and cluster.get("hash"):
+                hit = self.cache.lookup(cluster["hash"], self.model_name, ICON_SCHEMA_VERSION)
+            if hit is not None:
+                classified[path] = hit
+                stage_advance("classify")
+                continue
+
+            candidates.append(path)
+            hashes[path] = cluster.get("hash")
+
+        if self.cache is not None:
+            print(f"🗃️ Icon cache: {len(classified)} hits, {len(candidates)} to classify")
+
+        fresh = asyncio.run(self._classify_all(candidates, max(1, batch_size))) if candidates else {}
+
+        if self.cache is not None:
+            self.cache.store_many(
+                ((hashes[path], result) for path, result in fresh.items() if hashes[path]),
+                model=self.model_name,
+                schema=ICON_SCHEMA_VERSION,
+            )
+
+        classified.update(fresh)
+
+        stage_done("classify")
+
+        final_results = []
+        for cluster_id, cluster in enumerate(clusters):
+            result = classified.get(cluster["files"][0])
+            if result is None or result["kind"] != "ICON":
+                continue
+            final_results.append({
+                "cluster_id": cluster_id,
+                "representative": cluster["files"][0],
+                "files": cluster["files"],
+                "classification": {
+                    "label": result["label"],
+                    "meaning": result["meaning"],
+                    "description": result["description"],
+                    "confidence": result["confidence"]
+                }
+            })
 
         # Save results
         with open(output_path, "w", encoding="utf-8") as f:
@@ -1,7 +1,24 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from PIL import Image
 import imagehash
 import json
+import os
+
+import numpy as np
+
+from app.ingestion.icon_processing.icon_features import compute_icon_features_from_file
+
+# Above this many clusters, candidate lookups go through a multi-index
+# hash table instead of a vectorized scan over all representatives
+MULTI_INDEX_THRESHOLD = 1024
+
+# Crops without precomputed features are read from disk; past this many
+# the reads are spread over a process pool
+FEATURE_POOL_MIN = 256
+
+# 8-bit popcount table, used when numpy has no bitwise_count (< 2.0)
+_POPCOUNT_8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
 
 
 def hash_icon(path: str) -> str:
@@ -10,49 +27,181 @@ def hash_icon(path: str) -> str:
     return str(imagehash.phash(img))
 
 
-def deduplicate_icons(icons_dir: str, output_json: str, similarity_threshold: int = 5):
+def hash_to_int(h) -> int:
+    """Pack a 64-bit ImageHash (or its hex string) into a Python int."""
+    return int(str(h), 16)
+
+
+def popcount64(x: np.ndarray) -> np.ndarray:
+    """Number of set bits per element of a uint64 array."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    x = np.ascontiguousarray(x, dtype=np.uint64)
+    return _POPCOUNT_8[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1)
+
+
+def hamming_distances(hashes: np.ndarray, h: int) -> np.ndarray:
+    """Hamming distance between one packed hash and an array of packed hashes."""
+    return popcount64(np.bitwise_xor(hashes, np.uint64(h)))
+
+
+# ---------------------------------------------------------
+# MULTI-INDEX HASHING
+# ---------------------------------------------------------
+class MultiIndexHash:
+    """
+    Exact Hamming radius search over 64-bit hashes.
+    The hash is split into radius + 1 disjoint bit ranges; by pigeonhole,
+    two hashes within `radius` agree exactly on at least one range. Only
+    entries sharing a range value are candidates, and candidates are then
+    verified with a full popcount.
+    """
+
+    def __init__(self, radius: int, bits: int = 64):
+        num_parts = min(radius + 1, bits)
+        edges = [bits * i // num_parts for i in range(num_parts + 1)]
+        self.parts = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self.tables = [{} for _ in self.parts]
+        self.hashes = []
+
+    def add(self, h: int, value) -> None:
+        entry = len(self.hashes)
+        self.hashes.append((h, value))
+        for (shift, mask), table in zip(self.parts, self.tables):
+            table.setdefault((h >> shift) & mask, []).append(entry)
+
+    def query(self, h: int, radius: int):
+        """All (value, distance) within radius of h (radius <= the build radius)."""
+        candidates = set()
+        for (shift, mask), table in zip(self.parts, self.tables):
+            candidates.update(table.get((h >> shift) & mask, ()))
+
+        found = []
+        for entry in candidates:
+            other, value = self.hashes[entry]
+            d = (h ^ other).bit_count()
+            if d <= radius:
+                found.append((value, d))
+        return found
+
+
+# ---------------------------------------------------------
+# CLUSTERING
+# ---------------------------------------------------------
+def cluster_hashes(hashes, similarity_threshold: int = 5, multi_index_threshold: int = MULTI_INDEX_THRESHOLD):
+    """
+    Greedy leader clustering over packed 64-bit hashes.
+    Each hash joins the oldest cluster whose representative is within
+    similarity_threshold, otherwise it starts a new cluster.
+
+    Representatives live in a preallocated uint64 array and are scanned
+    with a vectorized XOR + popcount; once there are more than
+    multi_index_threshold clusters the scan is replaced by a
+    MultiIndexHash lookup.
+    Both paths give identical results.
+
+    Returns the cluster index of every input hash.
+    """
+    n = len(hashes)
+    reps = np.empty(max(n, 1), dtype=np.uint64)
+    num_clusters = 0
+    index = None
+    assignment = []
+
+    for h in hashes:
+        match = -1
+
+        if index is not None:
+            hits = index.query(h, similarity_threshold)
+            if hits:
+                match = min(cluster for cluster, _ in hits)
+        elif num_clusters:
+            close = np.flatnonzero(hamming_distances(reps[:num_clusters], h) <= similarity_threshold)
+            if close.size:
+                match = int(close[0])
+
+        if match < 0:
+            match = num_clusters
+            reps[num_clusters] = h
+            num_clusters += 1
+
+            if index is not None:
+                index.add(h, match)
+            elif num_clusters > multi_index_threshold:
+                index = MultiIndexHash(similarity_threshold)
+                for cluster in range(num_clusters):
+                    index.add(int(reps[cluster]), cluster)
+
+        assignment.append(match)
+
+    return assignment
+
+
+def compute_missing_features(icons, workers: int = 0):
+    """
+    Fill in "phash" / "features" for icon records that lack them
+    (e.g. crops listed straight from a folder). Detector output already
+    carries both, so this normally reads nothing from disk.
+    """
+    missing = [icon for icon in icons if "phash" not in icon]
+    if not missing:
+        return icons
+
+    paths = [icon["file"] for icon in missing]
+    if len(paths) >= FEATURE_POOL_MIN:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            results = list(pool.map(compute_icon_features_from_file, paths, chunksize=32))
+    else:
+        results = [compute_icon_features_from_file(path) for path in paths]
+
+    for icon, features in zip(missing, results):
+        if features is None:
+            icon["phash"] = None
+            icon["features"] = None
+        else:
+            icon["phash"] = features.pop("phash")
+            icon["features"] = features
+
+    return icons
+
+
+def deduplicate_icons(icons_dir: str, output_json: str, similarity_threshold: int = 5, icons=None):
     """
     Detect duplicate icons using perceptual hashing.
     Icons with phash distance <= threshold are considered duplicates.
-    Saves clusters to a JSON file.
-    """
+    Icons are processed in sorted file-name order, so clusters do not
+    depend on filesystem listing order.
 
-    icons_dir = Path(icons_dir)
-    icons = list(icons_dir.glob("*.png"))
+    icons: detector metadata ({"file", "phash", "features", ...}); the
+    hashes it carries are used as-is. Without it every PNG in icons_dir
+    is hashed from disk.
 
-    icon_hashes = {}
-    clusters = []
+    Saves clusters to a JSON file; each cluster keeps its representative's
+    features so the text filter needs no image I/O either.
+    """
+
+    if icons is None:
+        icons = [{"file": str(path)} for path in Path(icons_dir).glob("*.png")]
 
-    for icon in icons:
-        h = imagehash.phash(Image.open(icon).convert("L"))
+    icons = sorted(compute_missing_features(icons), key=lambda icon: icon["file"])
+    # Unreadable crops cannot be hashed or classified
+    icons = [icon for icon in icons if icon["phash"] is not None]
 
-        # Try to match to an existing cluster
-        found_cluster = None
-        for cluster in clusters:
-            representative_hash = cluster["hash"]
-            if h - representative_hash <= similarity_threshold:
-                cluster["files"].append(str(icon))
-                found_cluster = cluster
-                break
+    hashes = [hash_to_int(icon["phash"]) for icon in icons]
 
-        # If not matched, create new cluster
-        if not found_cluster:
+    clusters = []
+    for icon, h, cluster in zip(icons, hashes, cluster_hashes(hashes, similarity_threshold)):
+        if cluster == len(clusters):
             clusters.append({
-                "hash": h,
-                "files": [str(icon)]
+                "hash": f"{h:016x}",
+                "files": [],
+                "features": icon["features"],
             })
-
-    # Convert hashes to strings for JSON
-    output = []
-    for c in clusters:
-        output.append({
-            "hash": str(c["hash"]),
-            "files": c["files"]
-        })
+        clusters[cluster]["files"].append(icon["file"])
 
     with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2)
+        json.dump(clusters, f, indent=2)
 
     print(f"Found {len(clusters)} unique icon clusters (from {len(icons)} total).")
 
-    return output
+    return clusters
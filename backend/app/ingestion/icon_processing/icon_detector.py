@@ -2,25 +2,45 @@ import cv2
 import numpy as np
 from pathlib import Path
 
+from app.ingestion.icon_processing.icon_features import compute_icon_features
+
 
 def extract_icons_from_page(
     page_image_path: str,
     output_dir: str,
+    **filters,
+):
+    """
+    Icon extraction from a rendered page PNG on disk.
+    See extract_icons_from_image for the filters.
+    """
+    image = cv2.imread(page_image_path)
+    return extract_icons_from_image(image, Path(page_image_path).stem, output_dir, **filters)
+
+
+def extract_icons_from_image(
+    image: np.ndarray,
+    page_name: str,
+    output_dir: str,
     min_area=600,           # minimum number of pixels in the contour
     max_area=30000,         # avoid capturing large diagram chunks
     min_solidity=0.5,       # solidity filter (exclude letters)
-    max_aspect_ratio=2.0    # exclude long thin shapes (lines, borders)
+    max_aspect_ratio=2.0,   # exclude long thin shapes (lines, borders)
+    color_order="BGR",      # "RGB" for arrays wrapped from fitz pixmaps
 ):
     """
     Highly filtered icon extractor for manuals with vector-based icons.
     Removes letters, line fragments, and diagram parts.
+    Works on an in-memory (h, w, 3) uint8 page image; only the icon
+    crops are written to output_dir. Each crop's phash and text-filter
+    features are computed here, while it is still in memory.
     """
 
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    image = cv2.imread(page_image_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    rgb = color_order == "RGB"
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY)
 
     # Threshold to isolate shapes
     _, thresh = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
@@ -32,7 +52,6 @@ def extract_icons_from_page(
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
     icons = []
-    page_name = Path(page_image_path).stem
     page_h, page_w = gray.shape
 
     for idx, cnt in enumerate(contours):
@@ -68,15 +87,24 @@ def extract_icons_from_page(
 
         # Save icon
         crop_img = image[y:y+h, x:x+w]
+        if rgb:
+            crop_rgb = crop_img
+            crop_img = cv2.cvtColor(crop_img, cv2.COLOR_RGB2BGR)
+        else:
+            crop_rgb = cv2.cvtColor(crop_img, cv2.COLOR_BGR2RGB)
         out_path = output_dir / f"{page_name}_icon_{idx:04}.png"
         cv2.imwrite(str(out_path), crop_img)
 
+        features = compute_icon_features(crop_rgb)
+
         icons.append({
             "file": str(out_path),
             "bbox": (x, y, w, h),
             "area": area,
             "solidity": solidity,
-            "density": float(density)
+            "density": float(density),
+            "phash": features.pop("phash"),
+            "features": features,
         })
 
     return icons
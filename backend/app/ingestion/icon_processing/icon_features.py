@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+from PIL import Image
+import imagehash
+
+
+# ---------------------------------------------------------
+# Per-crop features, computed once while the crop is in memory
+# ---------------------------------------------------------
+def compute_icon_features(crop_rgb: np.ndarray) -> dict:
+    """
+    Features of one icon crop ((h, w, 3) uint8, RGB):
+    - phash: 64-bit perceptual hash as 16 hex chars (same value as
+      imagehash.phash on the saved PNG), used by the deduplicator
+    - width / height / aspect / black_ratio: inputs of is_text_like
+    """
+    h, w = crop_rgb.shape[:2]
+
+    phash = imagehash.phash(Image.fromarray(crop_rgb).convert("L"))
+
+    gray = cv2.cvtColor(crop_rgb, cv2.COLOR_RGB2GRAY)
+    thresh = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)[1]
+    black_ratio = float(np.count_nonzero(thresh)) / (h * w) if h and w else 0.0
+
+    return {
+        "phash": str(phash),
+        "width": int(w),
+        "height": int(h),
+        "aspect": w / h if h else 0.0,
+        "black_ratio": black_ratio,
+    }
+
+
+def compute_icon_features_from_file(path: str) -> dict | None:
+    """Same as compute_icon_features for a crop on disk (None if unreadable)."""
+    img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    return compute_icon_features(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+
+def is_text_like(features: dict | None) -> bool:
+    """
+    Heuristic to remove text fragments before Gemini is called,
+    evaluated on precomputed features (no image I/O).
+    """
+    if not features:
+        return True
+
+    # Very small images = likely text/noise
+    if features["width"] < 25 or features["height"] < 20:
+        return True
+
+    # Text-like aspect ratios
+    aspect = features["aspect"]
+    if aspect > 5.0 or aspect < 0.2:
+        return True
+
+    # Black pixel ratio (text is thin)
+    if features["black_ratio"] < 0.12:
+        return True
+
+    return False
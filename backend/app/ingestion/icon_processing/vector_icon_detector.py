@@ -0,0 +1,127 @@
+import fitz  # PyMuPDF
+import numpy as np
+from pathlib import Path
+
+from app.ingestion.icon_processing.icon_features import compute_icon_features
+
+fitz.TOOLS.mupdf_display_errors(False)
+
+
+def is_scanned_page(page: "fitz.Page", coverage: float = 0.8) -> bool:
+    """
+    A page with no text layer whose area is mostly one raster image is a scan:
+    its icons only exist as pixels, so the raster detector must be used.
+    """
+    if page.get_text("text").strip():
+        return False
+
+    page_area = abs(page.rect)
+    for img in page.get_images(full=True):
+        for rect in page.get_image_rects(img[0]):
+            if page_area and abs(rect & page.rect) / page_area >= coverage:
+                return True
+    return False
+
+
+def _contains(outer: "fitz.Rect", inner: "fitz.Rect", tolerance: float = 1.0) -> bool:
+    return (
+        inner.x0 >= outer.x0 - tolerance and inner.y0 >= outer.y0 - tolerance
+        and inner.x1 <= outer.x1 + tolerance and inner.y1 <= outer.y1 + tolerance
+    )
+
+
+def find_icon_candidates(
+    page: "fitz.Page",
+    min_size=8.0,           # points; smaller = bullets, dots
+    max_size=110.0,         # points; larger = photos, diagrams
+    max_aspect_ratio=2.5,   # exclude rules, borders, table lines
+    margin=7.0,             # points; ignore headers/footers at the edge
+):
+    """
+    Icon candidates straight from the PDF structure, with exact bounding boxes:
+    - embedded images (page.get_images / get_image_rects)
+    - clusters of vector drawings (page.cluster_drawings)
+    Returns [(rect, source)] with rects contained in another candidate removed.
+    """
+    candidates = []
+
+    for img in page.get_images(full=True):
+        for rect in page.get_image_rects(img[0]):
+            candidates.append((fitz.Rect(rect), "image"))
+
+    for rect in page.cluster_drawings():
+        candidates.append((fitz.Rect(rect), "drawing"))
+
+    page_rect = page.rect
+    kept = []
+
+    for rect, source in candidates:
+        rect &= page_rect
+        w, h = rect.width, rect.height
+
+        if w < min_size or h < min_size:
+            continue
+        if w > max_size or h > max_size:
+            continue
+        if max(w / h, h / w) > max_aspect_ratio:
+            continue
+        if (
+            rect.x0 < page_rect.x0 + margin or rect.y0 < page_rect.y0 + margin
+            or rect.x1 > page_rect.x1 - margin or rect.y1 > page_rect.y1 - margin
+        ):
+            continue
+
+        kept.append((rect, source))
+
+    # Largest first, so parts of an icon (an image inside a drawn frame)
+    # collapse into the enclosing candidate
+    kept.sort(key=lambda c: abs(c[0]), reverse=True)
+    result = []
+    for rect, source in kept:
+        if any(_contains(other, rect) for other, _ in result):
+            continue
+        result.append((rect, source))
+
+    # Reading order: top-to-bottom, left-to-right
+    result.sort(key=lambda c: (round(c[0].y0), c[0].x0))
+    return result
+
+
+def extract_icons_from_pdf_page(
+    page: "fitz.Page",
+    page_name: str,
+    output_dir: str,
+    dpi: int = 300,
+    **filters,
+):
+    """
+    Vector-aware icon extractor for born-digital manuals.
+    Candidates come from the PDF drawing list / image placements, and only
+    those clipped regions are rendered (at high DPI); the full page is never
+    rasterized. Output files and metadata match extract_icons_from_image.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    icons = []
+
+    for idx, (rect, source) in enumerate(find_icon_candidates(page, **filters)):
+        pix = page.get_pixmap(dpi=dpi, clip=rect, colorspace=fitz.csRGB, alpha=False)
+
+        out_path = output_dir / f"{page_name}_icon_{idx:04}.png"
+        pix.save(out_path)
+
+        # Zero-copy view of the RGB samples for hashing / text features
+        crop_rgb = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.h, pix.w, 3)
+        features = compute_icon_features(crop_rgb)
+
+        icons.append({
+            "file": str(out_path),
+            "bbox": (rect.x0, rect.y0, rect.width, rect.height),  # PDF points
+            "area": pix.width * pix.height,
+            "source": source,
+            "phash": features.pop("phash"),
+            "features": features,
+        })
+
+    return icons
@@ -1,19 +1,34 @@
 from pathlib import Path
 import json
 
-from app.ingestion.pipeline.page_renderer import render_pdf_to_images
+from app.ingestion.pipeline.page_renderer import render_pdf_to_images, detect_icons_by_page, page_image_name
+from app.ingestion.pipeline.ingest_manifest import hash_pages, load_manifest, update_manifest, reusable_pages
 from app.ingestion.icon_processing.icon_detector import extract_icons_from_page
 from app.ingestion.icon_processing.icon_deduplicator import deduplicate_icons
 
 from app.ingestion.icon_processing.icon_classifier_batched import IconClassifierBatched
+from app.ingestion.icon_processing.icon_cache import get_icon_cache
 
-from app.core.config import GOOGLE_API_KEY, GEMINI_MODEL
+from app.core.config import (
+    GOOGLE_API_KEY,
+    GEMINI_MODEL,
+    RENDER_WORKERS,
+    PAGE_STREAMING,
+    SAVE_PAGE_IMAGES,
+    ICON_DETECTOR,
+    VECTOR_ICON_DPI,
+    INCREMENTAL_INGEST,
+)
+from app.rag.utils.progress import stage_start, stage_advance, stage_done
 
 
 def ingest_manual(pdf_path: str, out_dir: str):
     """
     Full ingestion pipeline:
-    - Render PDF pages
+    - Render PDF pages (in memory when PAGE_STREAMING is on); with
+      INCREMENTAL_INGEST, pages unchanged since the last run (per-page
+      content hash in ingest_manifest.json) keep their icons and are
+      not rendered again
     - Extract icon crops
     - Deduplicate icons
     - Classify icons with Gemini
@@ -26,19 +41,65 @@ def ingest_manual(pdf_path: str, out_dir: str):
     pages_dir.mkdir(parents=True, exist_ok=True)
     icons_dir.mkdir(parents=True, exist_ok=True)
 
-    # Clean old icons before extraction
-    for f in icons_dir.glob("*.png"):
-        f.unlink()
-
-    print("Rendering PDF pages to images...")
-    render_pdf_to_images(pdf_path, pages_dir)
-
-    print("Extracting icons from pages...")
-    all_icons = []
-
-    for page_img in pages_dir.glob("*.png"):
-        icons = extract_icons_from_page(str(page_img), icons_dir)
-        all_icons.extend(icons)
+    page_hashes = hash_pages(pdf_path)
+    detection = {"detector": ICON_DETECTOR, "vector_dpi": VECTOR_ICON_DPI}
+
+    reused = {}
+    if INCREMENTAL_INGEST and PAGE_STREAMING:
+        reused = reusable_pages(load_manifest(str(out_dir)), page_hashes, detection)
+
+    # Clean old pages/icons before extraction (except those of reused pages)
+    keep = {Path(page_image_name(page_index)).stem for page_index in reused}
+    for f in [*pages_dir.glob("*.png"), *icons_dir.glob("*.png")]:
+        if f.stem.split("_icon_")[0] not in keep:
+            f.unlink()
+
+    if PAGE_STREAMING:
+        if reused:
+            print(f"Reusing icons of {len(reused)}/{len(page_hashes)} unchanged pages.")
+
+        print("Rendering pages + extracting icons in memory...")
+        icons_by_page = detect_icons_by_page(
+            pdf_path,
+            icons_dir,
+            workers=RENDER_WORKERS,
+            pages_dir=str(pages_dir) if SAVE_PAGE_IMAGES else None,
+            detector=ICON_DETECTOR,
+            vector_dpi=VECTOR_ICON_DPI,
+            pages=[page_index for page_index in range(len(page_hashes)) if page_index not in reused],
+        )
+        icons_by_page.update(reused)
+
+        all_icons = [icon for page_index in sorted(icons_by_page) for icon in icons_by_page[page_index]]
+
+        # Crops on disk now match these hashes
+        update_manifest(
+            str(out_dir),
+            detection=detection,
+            pages=[
+                {"hash": page_hash, "icons": icons_by_page.get(page_index, [])}
+                for page_index, page_hash in enumerate(page_hashes)
+            ],
+        )
+    else:
+        # The legacy path always starts over
+        update_manifest(str(out_dir), detection=None, pages=None)
+
+        print("Rendering PDF pages to images...")
+        render_pdf_to_images(pdf_path, pages_dir, workers=RENDER_WORKERS)
+
+        print("Extracting icons from pages...")
+        all_icons = []
+
+        page_images = sorted(pages_dir.glob("*.png"))
+        stage_start("detect", total=len(page_images), unit="pages")
+
+        for page_img in page_images:
+            icons = extract_icons_from_page(str(page_img), icons_dir)
+            all_icons.extend(icons)
+            stage_advance("detect")
+
+        stage_done("detect")
 
     print(f"✓ Extracted {len(all_icons)} raw icon crops.")
 
@@ -49,13 +110,13 @@ def ingest_manual(pdf_path: str, out_dir: str):
     print("De-duplicating icons...")
     clusters_path = out_dir / "icons_clusters.json"
 
+    stage_start("dedup", total=len(all_icons), unit="icons")
     deduplicate_icons(
         icons_dir=str(icons_dir),
-        output_json=str(clusters_path)
+        output_json=str(clusters_path),
+        icons=all_icons,
     )
-
-    print("Deduplicating from:", icons_dir)
-    print("Files in folder:", len(list(icons_dir.glob('*.png'))))
+    stage_done("dedup")
 
     # ------------------------------
     # STEP 3: Icon classification pipeline
@@ -65,13 +126,13 @@ def ingest_manual(pdf_path: str, out_dir: str):
 
     classifier = IconClassifierBatched(
         api_key=GOOGLE_API_KEY,
-        model_name=GEMINI_MODEL
+        model_name=GEMINI_MODEL,
+        cache=get_icon_cache(),
     )
 
     classifier.classify_clusters(
         clusters_path=str(clusters_path),
         output_path=str(out_dir / "icons_classified.json"),
-        batch_size=10
     )
 
     print("Ingest complete.")
@@ -2,14 +2,16 @@ import json
 from pathlib import Path
 from app.ingestion.smart_chunker import chunk_markdown_smart
 from app.rag.vector_store import LocalVectorStore
-from sentence_transformers import SentenceTransformer
+from app.rag.embedding_store import EmbeddingStoreWriter
+from app.rag.embedder import get_embedder
 from app.core.config import EMBEDDING_MODEL
 
 
 def ingest_markdown(md_path: str, out_dir: str):
     """
     Ingest a markdown file and create chunks + embeddings.
-    Produces rag_chunks_with_embeddings.json inside out_dir.
+    Produces rag_chunks_with_embeddings.json inside out_dir,
+    plus the memory-mappable embeddings.npy + chunks.jsonl store.
     """
     md_path = Path(md_path)
     out_dir = Path(out_dir)
@@ -21,8 +23,9 @@ def ingest_markdown(md_path: str, out_dir: str):
     chunks = chunk_markdown_smart(text)
 
     # 2. Embeddings
-    model = SentenceTransformer(EMBEDDING_MODEL)
-    embeddings = model.encode([c["content"] for c in chunks]).tolist()
+    embedder = get_embedder(EMBEDDING_MODEL)
+    vectors = embedder.encode([c["content"] for c in chunks])
+    embeddings = vectors.tolist()
 
     # 3. Combine chunks + embeddings
     rag_data = []
@@ -37,4 +40,14 @@ def ingest_markdown(md_path: str, out_dir: str):
     out_file = out_dir / "rag_chunks_with_embeddings.json"
     out_file.write_text(json.dumps(rag_data, indent=2), encoding="utf-8")
 
+    with EmbeddingStoreWriter(str(out_dir), model_name=EMBEDDING_MODEL, dim=embedder.dim) as store:
+        if rag_data:
+            store.add(
+                [
+                    {"id": r["id"], "text": r["text"], "metadata": {"section": r["section"]}}
+                    for r in rag_data
+                ],
+                vectors,
+            )
+
     return str(out_file)
@@ -1,12 +1,32 @@
+from collections import deque
+from contextlib import ExitStack
+from itertools import chain
 from pathlib import Path
-import json
-from typing import Iterator, List
+import math
+import time
+from typing import Iterable, Iterator, List, Tuple
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 from app.ingestion.icon_processing.icon_tokenizer import generate_icon_token_map
-from app.ingestion.pipeline.text_icon_merger import merge_icons_into_text
-from app.core.config import EMBEDDING_MODEL
+from app.ingestion.pipeline.text_icon_merger import PAGE_SEPARATOR, merge_icons_into_text
+from app.ingestion.pipeline.ingest_manifest import hash_text, load_reusable_vectors, update_manifest
+from app.core.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBED_BATCH_SIZE,
+    EMBED_BATCH_MAX,
+    EMBED_WORKERS,
+    EMBED_THREADS_PER_WORKER,
+    WRITE_LEGACY_JSON,
+    INCREMENTAL_INGEST,
+)
+from app.rag.embedding_store import EmbeddingStoreWriter, LegacyJsonWriter, LEGACY_JSON_FILE
+from app.rag.ann_index import build_and_save_index
+from app.rag.vector_compression import build_compressed_vectors
+from app.rag.embedder import get_embedder
+from app.rag.embedding_pool import EmbeddingPool
+from app.rag.utils.progress import stage_start, stage_advance, stage_done
 
 
 # ---------------------------------------------------------
@@ -23,45 +43,214 @@ def generate_chunks_from_file(
     - never produces duplicate chunks
     - handles overlap correctly
     - handles last piece safely
+    - restarts at every PAGE_SEPARATOR: chunks never span two pages, so a
+      page's chunks depend on that page's text only (and an unchanged page
+      reuses its vectors in an incremental run)
     """
 
     buffer = ""
 
+    def split(final: bool):
+        nonlocal buffer
+        # While we have enough to produce a chunk
+        while len(buffer) >= chunk_size:
+            # take the chunk
+            chunk = buffer[:chunk_size].rstrip()
+
+            yield chunk
+
+            # safe slice (no infinite loop)
+            buffer = buffer[chunk_size - chunk_overlap:]
+
+        # Flush the remainder of the page / file
+        if final:
+            if buffer.strip():
+                yield buffer.strip()
+            buffer = ""
+
     with open(file_path, "r", encoding="utf-8") as f:
         for line in f:
-            buffer += line
+            *finished_pages, line = line.split(PAGE_SEPARATOR)
+            for page_end in finished_pages:
+                buffer += page_end if buffer else page_end.lstrip()
+                yield from split(final=True)
+
+            # A page's first chunk starts at its text, not at the separator's newline
+            buffer += line if buffer else line.lstrip()
+            yield from split(final=False)
+
+    yield from split(final=True)
+
+
+def estimate_chunk_count(file_path: str, chunk_size: int = 1200, chunk_overlap: int = 250) -> int:
+    """Approximate number of chunks generate_chunks_from_file will yield (for progress/ETA)."""
+    total = 0
+    for page in Path(file_path).read_text(encoding="utf-8").split(PAGE_SEPARATOR):
+        text_len = len(page.strip())
+        if text_len == 0:
+            continue
+        if text_len <= chunk_size:
+            total += 1
+        else:
+            total += math.ceil((text_len - chunk_overlap) / (chunk_size - chunk_overlap))
+    return max(total, 1)
+
+
+# ---------------------------------------------------------
+# BATCH SIZE AUTO-TUNING
+# ---------------------------------------------------------
+class BatchSizeTuner:
+    """
+    Picks the embedding batch size by measured throughput:
+    starting at `start`, the size doubles while chunks/sec improves by
+    more than 10%, then stays at the fastest size seen (capped at max_size).
+    """
 
-            # While we have enough to produce a chunk
-            while len(buffer) >= chunk_size:
-                # take the chunk
-                chunk = buffer[:chunk_size].rstrip()
+    def __init__(self, start: int = 16, max_size: int = 256):
+        self.size = min(start, max_size)
+        self.max_size = max_size
+        self.best_rate = 0.0
+        self.best_size = self.size
+        self.settled = False
 
-                yield chunk
+    def record(self, count: int, seconds: float) -> None:
+        # A short tail batch says nothing about the current size
+        if self.settled or count < self.size or seconds <= 0:
+            return
 
-                # safe slice (no infinite loop)
-                buffer = buffer[chunk_size - chunk_overlap:]
+        rate = count / seconds
+        if rate > self.best_rate * 1.1 and self.size * 2 <= self.max_size:
+            self.best_rate, self.best_size = rate, self.size
+            self.size *= 2
+            return
 
-        # Flush the remainder
-        if buffer.strip():
-            yield buffer.strip()
+        if rate > self.best_rate:
+            self.best_rate, self.best_size = rate, self.size
+        self.size = self.best_size
+        self.settled = True
+        print(f"Embedding batch size tuned to {self.size} ({self.best_rate:.0f} chunks/s)")
 
 
+# Fixed batch size for the process pool when EMBED_BATCH_SIZE is auto
+POOL_BATCH_SIZE = 64
+
 
 # ---------------------------------------------------------
-# MICRO-BATCH EMBEDDER (FAST + MEMORY SAFE)
+# MICRO-BATCH EMBEDDER
 # ---------------------------------------------------------
 class MiniLMMicroBatchEmbedder:
     """
-    Embeds text in micro-batches for speed and safety.
-    No huge memory spikes. Batch size 4 is optimal.
+    Embeds text in batches and hands the float32 matrices on as-is
+    (no Python lists / floats).
+    - batch_size=0 auto-tunes the size by throughput (BatchSizeTuner)
+    - workers != 1 fans batches out over an EmbeddingPool (0 = all cores),
+      with threads_per_worker torch threads each; batch order is kept
     """
 
-    def __init__(self, model_name: str, batch_size: int = 4):
-        self.model = SentenceTransformer(model_name)
-        self.batch_size = batch_size
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_batch_size: int = EMBED_BATCH_MAX,
+        workers: int = EMBED_WORKERS,
+        threads_per_worker: int = EMBED_THREADS_PER_WORKER,
+    ):
+        self.model_name = model_name
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+
+        if workers != 1 and batch_size <= 0:
+            # Throughput is measured per process; the pool uses a fixed size
+            batch_size = POOL_BATCH_SIZE
+
+        # Shared with LocalVectorStore: weights are loaded once per process
+        self.embedder = get_embedder(model_name)
+        self.tuner = BatchSizeTuner(max_size=max_batch_size) if batch_size <= 0 else None
+        self._batch_size = batch_size
+
+    @property
+    def batch_size(self) -> int:
+        return self.tuner.size if self.tuner else self._batch_size
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        started = time.perf_counter()
+        vectors = self.embedder.encode(texts, batch_size=len(texts))
+        if self.tuner:
+            self.tuner.record(len(texts), time.perf_counter() - started)
+        return vectors
+
+    def _batches(self, texts: Iterable[str]) -> Iterator[List[str]]:
+        # batch_size is re-read per batch: the tuner may change it
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def embed_stream(self, texts: Iterable[str]) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """Group a text stream into batches → (texts, (n x dim) float32 vectors), in order."""
+        batches = self._batches(texts)
+
+        # Nothing to embed: do not load the model / start the pool
+        first = next(batches, None)
+        if first is None:
+            return
+        batches = chain([first], batches)
+
+        if self.workers != 1:
+            with EmbeddingPool(self.model_name, self.workers, self.threads_per_worker) as pool:
+                print(f"Embedding with {pool.workers} worker processes "
+                      f"({self.threads_per_worker} thread(s) each, batch size {self.batch_size})")
+                yield from pool.map_batches(batches)
+            return
 
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        return self.model.encode(texts).tolist()
+        # Model load must not count towards the first timed batch
+        self.embedder.warm_up()
+
+        for batch in batches:
+            yield batch, self.embed_batch(batch)
+
+
+def embed_chunks_incremental(
+    embedder: MiniLMMicroBatchEmbedder,
+    texts: Iterable[str],
+    reusable: dict,
+) -> Iterator[Tuple[List[str], List[str], np.ndarray]]:
+    """
+    Like embed_stream, but a chunk whose text hash is in reusable takes
+    that stored vector instead of being embedded again.
+    Yields (texts, text hashes, vectors) runs, in chunk order.
+    """
+    pending = deque()  # [text, hash, vector] in chunk order
+    waiting = deque()  # entries of pending sent to the embedder
+
+    def misses():
+        for text in texts:
+            text_hash = hash_text(text)
+            entry = [text, text_hash, reusable.get(text_hash)]
+            pending.append(entry)
+            if entry[2] is None:
+                waiting.append(entry)
+                yield text
+
+    def ready():
+        entries = []
+        while pending and pending[0][2] is not None:
+            entries.append(pending.popleft())
+        if entries:
+            yield [e[0] for e in entries], [e[1] for e in entries], np.stack([e[2] for e in entries])
+
+    for _, vectors in embedder.embed_stream(misses()):
+        for vector in vectors:
+            waiting.popleft()[2] = vector
+        yield from ready()
+
+    # Reused chunks after the last embedded one
+    yield from ready()
 
 
 # ---------------------------------------------------------
@@ -75,9 +264,15 @@ def build_knowledge_base(
     """
     1. Generate icon token map
     2. Merge tokens with text
-    3. Chunk text (streaming)
-    4. Embed chunks in micro-batches
-    5. Write JSON array incrementally (memory-safe)
+    3. Chunk text (streaming, page by page)
+    4. Embed chunks in batches (EMBED_BATCH_SIZE, auto-tuned by default);
+       with INCREMENTAL_INGEST, chunks whose text is unchanged since the
+       last run reuse their stored vector (text hashes in ingest_manifest.json)
+    5. Write the vectors as a float32 .npy + chunks.jsonl sidecar
+       (memory-mapped by LocalVectorStore), plus the legacy JSON file
+       when WRITE_LEGACY_JSON is set
+    6. Build the optional FAISS index (VECTOR_INDEX) and compressed
+       vectors (VECTOR_STORAGE) next to it
     """
 
     out_dir = Path(out_dir)
@@ -85,7 +280,7 @@ def build_knowledge_base(
 
     icon_tokens_path = out_dir / "icon_tokens.json"
     enriched_text_path = out_dir / "text_with_icons.txt"
-    rag_output_path = out_dir / "rag_chunks_with_embeddings.json"
+    rag_output_path = out_dir / LEGACY_JSON_FILE
 
     # 1) Icon tokens
     print("Generating icon tokens...")
@@ -102,67 +297,69 @@ def build_knowledge_base(
         output_path=str(enriched_text_path),
     )
 
-    # 3) Prepare micro-batch embedder
-    embedder = MiniLMMicroBatchEmbedder(
-        EMBEDDING_MODEL,
-        batch_size=4  # best compromise for your machine
-    )
+    # 3) Prepare batch embedder + vectors of the previous run
+    embedder = MiniLMMicroBatchEmbedder(EMBEDDING_MODEL)
 
-    # 4) Stream chunks + embed + write JSON
-    print("Embedding chunks (micro-batches)...")
+    reusable = load_reusable_vectors(str(out_dir), EMBEDDING_MODEL, EMBEDDING_BACKEND) if INCREMENTAL_INGEST else {}
 
-    with rag_output_path.open("w", encoding="utf-8") as f:
-        f.write("[\n")
-        first = True
-        chunk_id = 0
-
-        batch = []
-
-        for chunk in generate_chunks_from_file(str(enriched_text_path)):
-            batch.append(chunk)
+    # The recorded hashes stop matching once the store is rewritten
+    update_manifest(str(out_dir), chunks=None)
 
-            # If batch is full → embed
-            if len(batch) >= embedder.batch_size:
-                vectors = embedder.embed_batch(batch)
+    # 4) Stream chunks + embed + write
+    print("Embedding chunks...")
 
-                for chunk_text, vector in zip(batch, vectors):
-                    record = {
-                        "id": f"chunk_{chunk_id}",
-                        "text": chunk_text,
-                        "embedding": vector,
-                        "metadata": {"source": pdf_path},
-                    }
+    estimated_chunks = estimate_chunk_count(str(enriched_text_path))
+    stage_start("chunk", total=estimated_chunks, unit="chunks")
+    stage_start("embed", total=estimated_chunks, unit="chunks")
 
-                    if not first:
-                        f.write(",\n")
-                    else:
-                        first = False
-
-                    f.write(json.dumps(record))
-                    chunk_id += 1
-
-                batch = []
+    def chunks():
+        for chunk in generate_chunks_from_file(str(enriched_text_path)):
+            stage_advance("chunk")
+            yield chunk
 
-        # Embed remaining small batch
-        if batch:
-            vectors = embedder.embed_batch(batch)
+    with ExitStack() as stack:
+        store = stack.enter_context(EmbeddingStoreWriter(str(out_dir), model_name=EMBEDDING_MODEL))
+        sinks = [store]
+        if WRITE_LEGACY_JSON:
+            sinks.append(stack.enter_context(LegacyJsonWriter(str(rag_output_path))))
 
-            for chunk_text, vector in zip(batch, vectors):
-                record = {
-                    "id": f"chunk_{chunk_id}",
+        chunk_id = 0
+        chunk_hashes = []
+        for texts, hashes, vectors in embed_chunks_incremental(embedder, chunks(), reusable):
+            records = [
+                {
+                    "id": f"chunk_{chunk_id + i}",
                     "text": chunk_text,
-                    "embedding": vector,
                     "metadata": {"source": pdf_path},
                 }
+                for i, chunk_text in enumerate(texts)
+            ]
+            chunk_id += len(texts)
+            chunk_hashes.extend(hashes)
+
+            for sink in sinks:
+                sink.add(records, vectors)
+            stage_advance("embed", len(texts))
+
+        if store.dim is None:
+            # No text at all: still record the model's vector size
+            store.dim = embedder.embedder.dim
 
-                if not first:
-                    f.write(",\n")
-                else:
-                    first = False
+    if not WRITE_LEGACY_JSON:
+        # A JSON file from an earlier run would no longer match the store
+        rag_output_path.unlink(missing_ok=True)
 
-                f.write(json.dumps(record))
-                chunk_id += 1
+    stage_done("chunk")
+    stage_done("embed")
+
+    update_manifest(
+        str(out_dir),
+        chunks={"model": EMBEDDING_MODEL, "backend": EMBEDDING_BACKEND, "hashes": chunk_hashes},
+    )
 
-        f.write("\n]\n")
+    reused = sum(text_hash in reusable for text_hash in chunk_hashes)
+    print(f"✓ RAG knowledge base saved: {out_dir} ({chunk_id} chunks, {reused} reused)")
 
-    print(f"✓ RAG knowledge base saved: {rag_output_path}")
+    # 5) ANN index + compressed copy (VECTOR_STORAGE) of the stored vectors
+    build_and_save_index(str(out_dir))
+    build_compressed_vectors(str(out_dir))
@@ -1,32 +1,48 @@
 from pathlib import Path
 from app.core.logger import logger
-from app.rag.utils.progress import update_progress, reset_progress
+from app.rag.utils.progress import STAGES, stage_skipped, update_progress
 
 from app.ingestion.ingest import ingest_manual
 from app.ingestion.pipeline.build_knowledge import build_knowledge_base
+from app.ingestion.pipeline.ingest_manifest import hash_file, ingest_settings, is_up_to_date, update_manifest
+from app.core.config import INCREMENTAL_INGEST
 
 def run_full_ingestion(pdf_path: str, output_dir: str):
     """
     Runs the entire ingestion pipeline with:
-    - Progress tracking
+    - Per-stage progress tracking (render, detect, dedup, classify,
+      merge, chunk, embed; see app/rag/utils/progress.py)
     - Logging instead of printing
+    - Incremental re-ingestion (INCREMENTAL_INGEST): an unchanged PDF is
+      skipped; otherwise only changed pages / chunks are redone
     - Safe execution for UI and VSCode
     """
     try:
-        reset_progress()
         logger.info(f"Starting full ingestion for {pdf_path}")
 
+        pdf_hash = hash_file(pdf_path)
+        settings = ingest_settings()
+
+        if INCREMENTAL_INGEST and is_up_to_date(output_dir, pdf_hash, settings):
+            logger.info("PDF unchanged since the last ingestion, keeping existing data.")
+            for stage in STAGES:
+                stage_skipped(stage)
+            update_progress("complete")
+            return
+
+        # Only a run that finishes marks the folder as up to date
+        update_manifest(output_dir, pdf_hash=None)
+
         # 1. Icon extraction + classification
-        update_progress("icons", 0)
+        update_progress("icons")
         logger.info("Step 1/2: Extracting and classifying icons...")
 
         ingest_manual(pdf_path, output_dir)
 
-        update_progress("icons", 100)
         logger.info("Icons extracted & classified.")
 
         # 2. Text + chunk + embedding
-        update_progress("embedding", 0)
+        update_progress("knowledge")
         logger.info("Step 2/2: Building text+embedding RAG dataset...")
 
         build_knowledge_base(
@@ -35,10 +51,12 @@ def run_full_ingestion(pdf_path: str, output_dir: str):
             out_dir=output_dir,
         )
 
-        update_progress("embedding", 100)
+        update_manifest(output_dir, pdf_hash=pdf_hash, settings=settings)
+
+        update_progress("complete")
         logger.info("Ingestion complete.")
 
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
-        update_progress("error", 0)
+        update_progress("error", error=str(e))
         raise
@@ -0,0 +1,178 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+import fitz  # PyMuPDF
+import numpy as np
+import xxhash
+
+from app.core.config import (
+    ICON_DETECTOR,
+    VECTOR_ICON_DPI,
+    PAGE_STREAMING,
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    VECTOR_INDEX,
+    VECTOR_STORAGE,
+)
+from app.rag.embedding_store import load_binary_store, has_binary_store
+
+fitz.TOOLS.mupdf_display_errors(False)
+
+# ---------------------------------------------------------
+# ingest_manifest.json (inside each processed manual folder)
+# ---------------------------------------------------------
+# version    format version; other versions are ignored
+# pdf_hash   hash of the whole PDF, written once a run has completed
+# settings   fingerprint of the settings that run was built with
+# detection  icon detection settings the "pages" entries were made with
+# pages      [{"hash", "icons": [icon metadata]}] in page order
+# chunks     {"model", "backend", "hashes"}: one text hash per embeddings.npy row
+INGEST_MANIFEST_FILE = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+HASH_BLOCK_BYTES = 1 << 20
+
+
+# ---------------------------------------------------------
+# HASHES (xxh3, 64 bit)
+# ---------------------------------------------------------
+def hash_file(path: str) -> str:
+    h = xxhash.xxh3_64()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return xxhash.xxh3_64_hexdigest(text.encode("utf-8"))
+
+
+def hash_page(page: "fitz.Page") -> str:
+    """
+    Hash of what draws the page: its content streams, the images and form
+    XObjects they use, plus page size and rotation. xref numbers are not
+    hashed, so a page survives the PDF being re-saved or edited elsewhere.
+    """
+    doc = page.parent
+    h = xxhash.xxh3_64()
+    h.update(f"{tuple(page.rect)}/{page.rotation}".encode())
+    h.update(page.read_contents())
+
+    for img in page.get_images(full=True):
+        h.update(img[7].encode())  # resource name used by the content stream
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+
+    for xobject in page.get_xobjects():
+        h.update(xobject[1].encode())
+        h.update(doc.xref_stream_raw(xobject[0]) or b"")
+
+    return h.hexdigest()
+
+
+def hash_pages(pdf_path: str) -> List[str]:
+    doc = fitz.open(pdf_path)
+    try:
+        return [hash_page(page) for page in doc]
+    finally:
+        doc.close()
+
+
+# ---------------------------------------------------------
+# MANIFEST I/O
+# ---------------------------------------------------------
+def load_manifest(out_dir: str) -> Dict[str, Any]:
+    """The folder's manifest, or {} if missing / unreadable / another version."""
+    path = Path(out_dir) / INGEST_MANIFEST_FILE
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+
+def update_manifest(out_dir: str, **fields) -> None:
+    """Set top-level manifest fields (None removes one); written atomically."""
+    manifest = load_manifest(out_dir) or {"version": MANIFEST_VERSION}
+    for key, value in fields.items():
+        if value is None:
+            manifest.pop(key, None)
+        else:
+            manifest[key] = value
+
+    path = Path(out_dir) / INGEST_MANIFEST_FILE
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------
+# REUSE
+# ---------------------------------------------------------
+def reusable_pages(manifest: Dict[str, Any], page_hashes: List[str], detection: Dict[str, Any]) -> Dict[int, list]:
+    """
+    page index → icon metadata of the previous run, for every page whose
+    hash is unchanged at the same index, detected with the same settings,
+    and whose icon crops are all still on disk.
+    """
+    if manifest.get("detection") != detection:
+        return {}
+
+    reused = {}
+    for page_index, (page_hash, previous) in enumerate(zip(page_hashes, manifest.get("pages") or [])):
+        if previous.get("hash") != page_hash:
+            continue
+        icons = previous.get("icons") or []
+        if all(Path(icon["file"]).exists() for icon in icons):
+            reused[page_index] = icons
+    return reused
+
+
+def load_reusable_vectors(out_dir: str, model: str, backend: str) -> Dict[str, np.ndarray]:
+    """
+    chunk text hash → stored (normalized) vector from the previous run,
+    if it was embedded with the same model + backend. Vectors are copied
+    out of the memmap: the store file is replaced while the new one is
+    written.
+    """
+    chunks = load_manifest(out_dir).get("chunks") or {}
+    if chunks.get("model") != model or chunks.get("backend") != backend:
+        return {}
+
+    try:
+        embeddings, _, _ = load_binary_store(str(out_dir))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+    hashes = chunks.get("hashes") or []
+    if len(hashes) != len(embeddings):
+        return {}
+
+    vectors = np.array(embeddings, dtype=np.float32)
+    return {text_hash: vectors[row] for row, text_hash in enumerate(hashes)}
+
+
+def ingest_settings() -> Dict[str, Any]:
+    """Settings a finished run depends on; a change forces the next run."""
+    return {
+        "detector": ICON_DETECTOR,
+        "vector_dpi": VECTOR_ICON_DPI,
+        "page_streaming": PAGE_STREAMING,
+        "model": EMBEDDING_MODEL,
+        "backend": EMBEDDING_BACKEND,
+        "vector_index": VECTOR_INDEX,
+        "vector_storage": VECTOR_STORAGE,
+    }
+
+
+def is_up_to_date(out_dir: str, pdf_hash: str, settings: Dict[str, Any]) -> bool:
+    """True if the last completed run in out_dir was for this exact PDF + settings."""
+    manifest = load_manifest(out_dir)
+    return (
+        manifest.get("pdf_hash") == pdf_hash
+        and manifest.get("settings") == settings
+        and has_binary_store(out_dir)
+        and (Path(out_dir) / "icons_classified.json").exists()
+    )
@@ -1,33 +1,236 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
 import fitz  # PyMuPDF
+import numpy as np
 from pathlib import Path
 
+from app.ingestion.icon_processing.icon_detector import extract_icons_from_image
+from app.ingestion.icon_processing.vector_icon_detector import extract_icons_from_pdf_page, is_scanned_page
+from app.rag.utils.progress import stage_start, stage_advance, stage_done
+
 fitz.TOOLS.mupdf_display_errors(False)
 
+# Below this many pages, process start-up costs more than it saves
+MIN_PAGES_FOR_POOL = 8
+
+# Shards per worker: small enough to balance uneven pages, large enough
+# to amortize task overhead
+SHARDS_PER_WORKER = 4
+
+
+def page_image_name(page_index: int) -> str:
+    return f"page_{page_index+1:03}.png"
+
+
+def resolve_workers(workers: int) -> int:
+    """0 → one per CPU core."""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def shard_pages(num_pages: int, num_shards: int):
+    """Split [0, num_pages) into contiguous (start, stop) ranges."""
+    size = max(1, math.ceil(num_pages / max(1, num_shards)))
+    return [(start, min(start + size, num_pages)) for start in range(0, num_pages, size)]
+
+
+def pixmap_to_array(pix: "fitz.Pixmap") -> np.ndarray:
+    """
+    Zero-copy (h, w, n) uint8 view of a pixmap's samples (RGB for the
+    default colorspace). The array borrows the pixmap's buffer, so the
+    pixmap must stay alive while the array is used.
+    """
+    return np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+
 
-def render_pdf_to_images(pdf_path: str, output_dir: str, dpi: int = 200):
+def _detect_page(
+    doc,
+    page_index: int,
+    icons_dir: str,
+    dpi: int,
+    pages_dir: str | None,
+    detector: str = "raster",
+    vector_dpi: int = 300,
+):
+    """
+    Detect icons on one page without writing the page to disk.
+    - "vector" (or "auto" on born-digital pages): candidates from the PDF
+      drawing list, only the clipped icon regions are rendered
+    - "raster" (or "auto" on scanned pages): render the page in memory and
+      run contour detection on the pixmap directly
+    """
+    page = doc[page_index]
+    page_name = Path(page_image_name(page_index)).stem
+
+    pix = None
+    if pages_dir is not None:
+        pix = page.get_pixmap(dpi=dpi)
+        pix.save(Path(pages_dir) / page_image_name(page_index))
+
+    if detector == "vector" or (detector == "auto" and not is_scanned_page(page)):
+        return extract_icons_from_pdf_page(page, page_name, icons_dir, dpi=vector_dpi)
+
+    # The saved page (if any) is the same render: detect on it directly
+    if pix is None:
+        pix = page.get_pixmap(dpi=dpi)
+    return extract_icons_from_image(pixmap_to_array(pix), page_name, icons_dir, color_order="RGB")
+
+
+# ---------------------------------------------------------
+# Pool workers: one fitz document per worker process
+# ---------------------------------------------------------
+_worker_doc = None
+
+
+def _init_render_worker(pdf_path: str):
+    global _worker_doc
+    fitz.TOOLS.mupdf_display_errors(False)
+    _worker_doc = fitz.open(pdf_path)
+
+
+def _render_range(start: int, stop: int, output_dir: str, dpi: int) -> int:
+    output_dir = Path(output_dir)
+    for page_index in range(start, stop):
+        pix = _worker_doc[page_index].get_pixmap(dpi=dpi)
+        pix.save(output_dir / page_image_name(page_index))
+    return stop - start
+
+
+def _detect_pages(page_indices, icons_dir: str, dpi: int, pages_dir: str | None, detector: str, vector_dpi: int):
+    return {
+        page_index: _detect_page(_worker_doc, page_index, icons_dir, dpi, pages_dir, detector, vector_dpi)
+        for page_index in page_indices
+    }
+
+
+def render_pdf_to_images(pdf_path: str, output_dir: str, dpi: int = 200, workers: int = 1):
     """
     Render each page of the PDF into a high-resolution PNG image.
     This is required for extracting vector-based icons that do not exist as bitmap objects.
+
+    workers > 1 (or 0 = all cores) shards the page range across a process
+    pool; file names depend only on the page index, so output is identical
+    to the serial path.
     """
     pdf_path = Path(pdf_path)
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     doc = fitz.open(pdf_path)
+    num_pages = len(doc)
+    workers = min(resolve_workers(workers), num_pages) if num_pages else 1
 
     try:
-        for page_index in range(len(doc)):
-            page = doc[page_index]
-            pix = page.get_pixmap(dpi=dpi)
+        stage_start("render", total=num_pages, unit="pages")
+
+        if workers <= 1 or num_pages < MIN_PAGES_FOR_POOL:
+            for page_index in range(num_pages):
+                page = doc[page_index]
+                pix = page.get_pixmap(dpi=dpi)
+
+                img_path = output_dir / page_image_name(page_index)
+                pix.save(img_path)
+                stage_advance("render")
+        else:
+            shards = shard_pages(num_pages, workers * SHARDS_PER_WORKER)
 
-            img_path = output_dir / f"page_{page_index+1:03}.png"
-            pix.save(img_path)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_render_worker,
+                initargs=(str(pdf_path),),
+            ) as pool:
+                futures = [
+                    pool.submit(_render_range, start, stop, str(output_dir), dpi)
+                    for start, stop in shards
+                ]
+                for future in as_completed(futures):
+                    stage_advance("render", future.result())
 
-        print(f"Rendered {len(doc)} pages to PNG.")
+        stage_done("render")
+        print(f"Rendered {num_pages} pages to PNG ({workers} worker(s)).")
     finally:
         doc.close()
 
 
+def detect_icons_by_page(
+    pdf_path: str,
+    icons_dir: str,
+    dpi: int = 200,
+    workers: int = 1,
+    pages_dir: str | None = None,
+    detector: str = "raster",
+    vector_dpi: int = 300,
+    pages: list | None = None,
+):
+    """
+    Streaming render → detect: each page's pixmap is wrapped as a numpy
+    array (no copy) and handed straight to icon detection, so pages never
+    go through PNG encode/decode or disk. Pass pages_dir to also save the
+    page PNGs (debugging).
+
+    detector="vector"/"auto" takes candidates from the PDF drawing list
+    instead (see vector_icon_detector); born-digital pages are then never
+    rasterized as a whole.
+
+    pages restricts detection to these page indices (incremental
+    re-ingestion); None = every page.
+
+    Sharded across a process pool like render_pdf_to_images.
+    Returns {page_index: icon metadata list}.
+    """
+    icons_dir = str(icons_dir)
+    if pages_dir is not None:
+        Path(pages_dir).mkdir(parents=True, exist_ok=True)
+
+    doc = fitz.open(pdf_path)
+    todo = list(range(len(doc))) if pages is None else sorted(pages)
+    num_pages = len(todo)
+    workers = min(resolve_workers(workers), num_pages) if num_pages else 1
+
+    stage_start("render", total=num_pages, unit="pages")
+    stage_start("detect", total=num_pages, unit="pages")
+
+    icons_by_page = {}
+
+    try:
+        if workers <= 1 or num_pages < MIN_PAGES_FOR_POOL:
+            for page_index in todo:
+                icons_by_page[page_index] = _detect_page(
+                    doc, page_index, icons_dir, dpi, pages_dir, detector, vector_dpi
+                )
+                stage_advance("render")
+                stage_advance("detect")
+        else:
+            shards = shard_pages(num_pages, workers * SHARDS_PER_WORKER)
+
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_render_worker,
+                initargs=(str(pdf_path),),
+            ) as pool:
+                futures = [
+                    pool.submit(_detect_pages, todo[start:stop], icons_dir, dpi, pages_dir, detector, vector_dpi)
+                    for start, stop in shards
+                ]
+                for future in as_completed(futures):
+                    icons = future.result()
+                    icons_by_page.update(icons)
+                    stage_advance("render", len(icons))
+                    stage_advance("detect", len(icons))
+    finally:
+        doc.close()
+
+    stage_done("render")
+    stage_done("detect")
+
+    print(f"Rendered + scanned {num_pages} pages in memory ({workers} worker(s)).")
+    return icons_by_page
+
+
 # -----------------------------------------------------
 # CLI usage for manual testing
 # Uses the NEW folder structure (backend/app/data)
@@ -39,4 +242,4 @@ if __name__ == "__main__":
     PDF_PATH = APP_DIR / "data" / "manuals" / "user_manual.pdf"
     OUTPUT_DIR = APP_DIR / "data" / "processed" / "user_manual" / "pages"
 
-    render_pdf_to_images(str(PDF_PATH), str(OUTPUT_DIR))
+    render_pdf_to_images(str(PDF_PATH), str(OUTPUT_DIR), workers=0)
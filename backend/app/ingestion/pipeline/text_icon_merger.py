@@ -1,14 +1,23 @@
 import fitz
 import json
 from pathlib import Path
+
+from app.rag.utils.progress import stage_start, stage_advance, stage_done
+
 fitz.TOOLS.mupdf_display_errors(False)
 
+# Written between pages: the chunker never lets a chunk cross it, so an
+# edit on one page leaves the chunks of every other page unchanged
+PAGE_SEPARATOR = "\f"
+
+
 def merge_icons_into_text(pdf_path: str, tokens_path: str, output_path: str):
     """
     Very simple version:
     - Reads the PDF page by page
     - For each page, if it has icons, we prepend their tokens to the page text.
       (Good enough to make icons searchable and tied to the right context.)
+    - Pages are separated by PAGE_SEPARATOR (form feed)
     """
 
     tokens = json.load(open(tokens_path, "r", encoding="utf-8"))
@@ -23,12 +32,14 @@ def merge_icons_into_text(pdf_path: str, tokens_path: str, output_path: str):
     doc = fitz.open(pdf_path)
     pages_text = []
 
+    stage_start("merge", total=len(doc), unit="pages")
+
     for page_index in range(len(doc)):
         page = doc[page_index]
         page_id = f"page_{page_index+1:03}"
 
-        # Extract page text
-        text = page.get_text("text")
+        # Extract page text (a form feed inside it would split the page)
+        text = page.get_text("text").replace(PAGE_SEPARATOR, "\n")
 
         # If this page has icons, prepend their tokens
         page_tokens = tokens_by_page.get(page_id, [])
@@ -39,10 +50,12 @@ def merge_icons_into_text(pdf_path: str, tokens_path: str, output_path: str):
             enriched = text
 
         pages_text.append(enriched)
+        stage_advance("merge")
 
     doc.close()
+    stage_done("merge")
 
-    full_text = "\n\n".join(pages_text)
+    full_text = f"\n{PAGE_SEPARATOR}\n".join(pages_text)
 
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(full_text)
@@ -2,7 +2,24 @@ from pathlib import Path
 from typing import Optional, Dict, Any
 
 from app.core.logger import logger
-from app.ingestion.pipeline.full_ingest import run_full_ingestion
+from app.rag.embedding_store import LEGACY_JSON_FILE, has_binary_store
+
+
+def resolve_manual_id(pdf_path: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Folder name used for a manual under app/data/processed.
+    This is also the manual_id the manual registry and /ask use.
+    Prefers metadata model, then title, then the PDF filename stem.
+    """
+    folder_name: Optional[str] = None
+    if metadata:
+        folder_name = metadata.get("model") or metadata.get("title")
+
+    if not folder_name:
+        folder_name = Path(pdf_path).stem
+
+    # Sanitize folder name
+    return str(folder_name).replace("/", "_").replace("\\", "_").strip()
 
 
 def process_pdf(
@@ -13,7 +30,8 @@ def process_pdf(
     """
     Universal ingestion entry point.
     - Used by BOTH upload and scraping.
-    - Returns the FULL PATH to the final RAG JSON file (chunks + embeddings).
+    - Returns the FULL PATH to the processed manual folder
+      (binary embedding store + chunks).
 
     metadata can include: model, brand, language, title, source_url...
     """
@@ -30,16 +48,7 @@ def process_pdf(
 
     output_root.mkdir(parents=True, exist_ok=True)
 
-    # Decide folder name: prefer model, then title, then filename stem
-    folder_name: Optional[str] = None
-    if metadata:
-        folder_name = metadata.get("model") or metadata.get("title")
-
-    if not folder_name:
-        folder_name = pdf_path_p.stem
-
-    # Sanitize folder name
-    folder_name = str(folder_name).replace("/", "_").replace("\\", "_").strip()
+    folder_name = resolve_manual_id(pdf_path, metadata)
 
     output_dir = output_root / folder_name
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -50,15 +59,17 @@ def process_pdf(
         logger.info(f"[process_pdf] Metadata: {metadata}")
 
     # Run your full ingestion pipeline
+    # (imported here: the API process only needs resolve_manual_id, the
+    # OpenCV/PyMuPDF/torch pipeline is loaded by ingestion workers)
+    from app.ingestion.pipeline.full_ingest import run_full_ingestion
     run_full_ingestion(str(pdf_path_p), str(output_dir))
 
-    # The ingestion pipeline always places RAG chunks here:
-    rag_json = output_dir / "rag_chunks_with_embeddings.json"
-
-    if not rag_json.exists():
+    # The ingestion pipeline places the embedding store here
+    # (the legacy JSON file only when WRITE_LEGACY_JSON is set)
+    if not has_binary_store(str(output_dir)) and not (output_dir / LEGACY_JSON_FILE).exists():
         raise FileNotFoundError(
-            f"RAG embedding file not found: {rag_json}. "
-            f"run_full_ingestion() must generate rag_chunks_with_embeddings.json"
+            f"No embedding store found in {output_dir}. "
+            f"run_full_ingestion() must generate embeddings.npy + chunks.jsonl"
         )
 
     logger.info(f"[process_pdf] Returning output directory: {output_dir}")
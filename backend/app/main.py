@@ -1,5 +1,4 @@
 import os
-from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,7 +9,10 @@ import app.api.routers.ask_router as ask_router
 import app.api.routers.upload_router as upload_router
 import app.api.routers.status_router as status_router
 
-from app.rag.vector_store import LocalVectorStore
+from app.rag.manual_registry import registry
+from app.rag.embedder import get_embedder
+from app.qa.task_classifier import classify_task_local, uses_local_classifier
+from app.services.ingest_jobs import job_manager
 
 
 # -----------------------------------
@@ -40,33 +42,42 @@ app.add_middleware(
 )
 
 
-# Global vector store (shared across routers)
-vector_store = None
+# Default manual served when /ask does not name one
+DEFAULT_MANUAL_ID = os.getenv("DEFAULT_MANUAL_ID", "user_manual")
 
 
 def startup_event():
     """
-    Automatically load a default manual if it exists.
-    Now uses the *new* folder structure:
-    backend/app/data/processed/user_manual/...
+    Warm up the shared embedding model, then make the default manual
+    active (and load it) if it exists.
+    Every other manual under backend/app/data/processed/ is loaded lazily
+    by the manual registry on its first /ask.
     """
-    BASE_DIR = Path(__file__).resolve().parents[1]  # backend/app
-    DEFAULT_PROCESSED_DIR = BASE_DIR / "data" / "processed"
+    # Pay the model load + first-encode cost here, not on the first /ask
+    get_embedder().warm_up()
+    if uses_local_classifier():
+        classify_task_local("warm-up")  # builds the intent centroids
+    print("✓ Embedding model warmed up.")
 
-    default_rag_path = DEFAULT_PROCESSED_DIR / "user_manual" / "rag_chunks_with_embeddings.json"
+    if registry.exists(DEFAULT_MANUAL_ID):
+        registry.set_active(DEFAULT_MANUAL_ID)
+        registry.get(DEFAULT_MANUAL_ID)
 
-    if default_rag_path.exists():
-        global vector_store
-        vector_store = LocalVectorStore(str(default_rag_path))
+        print("✓ Loaded default manual automatically on startup.")
 
-        # Share loaded vector store with ask_router
-        ask_router.vector_store = vector_store
 
-        print("✓ Loaded default manual automatically on startup.")
+def shutdown_event():
+    """
+    Persist the query embedding cache (if QUERY_CACHE_PATH is set) and
+    stop any ingestion workers still running.
+    """
+    get_embedder().query_cache.save()
+    job_manager.shutdown()
 
 
-# Register the startup event
+# Register the startup/shutdown events
 app.add_event_handler("startup", startup_event)
+app.add_event_handler("shutdown", shutdown_event)
 
 
 # -----------------------------------
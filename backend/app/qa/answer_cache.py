@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import (
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_POLICY,
+    ANSWER_CACHE_SIMILARITY,
+)
+from app.rag.embedding_store import l2_normalize
+from app.rag.manual_registry import registry
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache in front of classify_task + generate_answer.
+
+    Entries are bucketed by (manual_id, retrieved chunk ids): an answer is
+    only reused when the same manual returned the same context. Inside a
+    bucket, the question embedding must be at least `similarity` cosine-close
+    to a cached question, so near-duplicates ("how do I descale?" /
+    "how to descale") hit while different questions never share an answer.
+
+    Eviction:
+    - max_entries bounds the total number of cached answers
+    - policy "lru" evicts least recently used buckets, "fifo" oldest inserted
+    - ttl_seconds expires entries by age (0 = never)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_SIZE,
+        ttl_seconds: int = ANSWER_CACHE_TTL,
+        policy: str = ANSWER_CACHE_POLICY,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+    ):
+        if policy not in ("lru", "fifo"):
+            raise ValueError(f"Unknown ANSWER_CACHE_POLICY '{policy}', expected 'lru' or 'fifo'")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.policy = policy
+        self.similarity = similarity
+
+        # (manual_id, chunk_ids) → list of {"vector", "answer", "intent", "created"}
+        self._buckets: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(manual_id: str, chunks: List[Dict]) -> tuple:
+        return manual_id, tuple(c["id"] for c in chunks)
+
+    def _expired(self, entry: Dict) -> bool:
+        return bool(self.ttl_seconds) and time.time() - entry["created"] > self.ttl_seconds
+
+    def lookup(self, manual_id: str, chunks: List[Dict], question_vector: np.ndarray):
+        """Return the cached {"answer", "intent"} for a near-duplicate question, or None."""
+        if self.max_entries <= 0:
+            return None
+
+        key = self._key(manual_id, chunks)
+        q = l2_normalize(question_vector)
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket:
+                live = [e for e in bucket if not self._expired(e)]
+                self._size -= len(bucket) - len(live)
+                bucket[:] = live
+
+            if not bucket:
+                self._buckets.pop(key, None)
+                self.misses += 1
+                return None
+
+            sims = np.stack([e["vector"] for e in bucket]) @ q
+            best = int(np.argmax(sims))
+            if sims[best] < self.similarity:
+                self.misses += 1
+                return None
+
+            if self.policy == "lru":
+                self._buckets.move_to_end(key)
+            self.hits += 1
+
+            entry = bucket[best]
+            return {"answer": entry["answer"], "intent": entry["intent"], "similarity": float(sims[best])}
+
+    def store(self, manual_id: str, chunks: List[Dict], question_vector: np.ndarray, answer: str, intent: str) -> None:
+        if self.max_entries <= 0:
+            return
+
+        key = self._key(manual_id, chunks)
+        entry = {
+            "vector": l2_normalize(question_vector),
+            "answer": answer,
+            "intent": intent,
+            "created": time.time(),
+        }
+
+        with self._lock:
+            self._buckets.setdefault(key, []).append(entry)
+            if self.policy == "lru":
+                # FIFO keeps a bucket at its first insertion position
+                self._buckets.move_to_end(key)
+            self._size += 1
+
+            while self._size > self.max_entries:
+                oldest_key = next(iter(self._buckets))
+                oldest = self._buckets[oldest_key]
+                oldest.pop(0)
+                self._size -= 1
+                self.evictions += 1
+                if not oldest:
+                    del self._buckets[oldest_key]
+
+    def invalidate_manual(self, manual_id: str) -> None:
+        """Drop every cached answer for a manual (called when it is re-ingested)."""
+        with self._lock:
+            for key in [k for k in self._buckets if k[0] == manual_id]:
+                self._size -= len(self._buckets.pop(key))
+                self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "buckets": len(self._buckets),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "policy": self.policy,
+                "similarity": self.similarity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Process-wide cache, cleared per manual whenever the registry reloads it
+answer_cache = SemanticAnswerCache()
+registry.add_invalidation_listener(answer_cache.invalidate_manual)
@@ -1,3 +1,5 @@
+from typing import Iterator
+
 import google.generativeai as genai
 from app.core.config import GOOGLE_API_KEY, GEMINI_MODEL
 
@@ -5,7 +7,7 @@ genai.configure(api_key=GOOGLE_API_KEY)
 model = genai.GenerativeModel(GEMINI_MODEL)
 
 
-def generate_answer(question: str, retrieved_chunks):
+def build_prompt(question: str, retrieved_chunks) -> str:
     """
     Builds a prompt that includes:
     - retrieved chunks (some include <icon:...> tokens)
@@ -14,7 +16,7 @@ def generate_answer(question: str, retrieved_chunks):
 
     context_texts = [c["text"] for c in retrieved_chunks]
 
-    prompt = f"""
+    return f"""
 You are a helpful assistant answering based ONLY on the user manual below.
 
 The manual includes icon tokens like <icon:ground_coffee_button>.
@@ -29,5 +31,21 @@ Relevant manual sections:
 Answer clearly and ONLY using the manual content.
 """
 
-    response = model.generate_content(prompt)
+
+def generate_answer(question: str, retrieved_chunks):
+    response = model.generate_content(build_prompt(question, retrieved_chunks))
     return response.text
+
+
+def generate_answer_stream(question: str, retrieved_chunks) -> Iterator[str]:
+    """Same prompt as generate_answer, but yields text pieces as Gemini streams them."""
+    response = model.generate_content(build_prompt(question, retrieved_chunks), stream=True)
+
+    for piece in response:
+        # Chunks without text (e.g. safety metadata only) raise on .text
+        try:
+            text = piece.text
+        except ValueError:
+            continue
+        if text:
+            yield text
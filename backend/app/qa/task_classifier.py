@@ -1,6 +1,102 @@
+import threading
+
+import numpy as np
 import google.generativeai as genai
-from app.core.config import GEMINI_MODEL
+from app.core.config import GEMINI_MODEL, INTENT_CLASSIFIER
+from app.rag.embedder import get_embedder
+from app.rag.embedding_store import l2_normalize
+
+INTENTS = ["instruction", "setup", "diagnosis", "maintenance", "explanation", "safety"]
+
+# Labelled example questions for the local nearest-centroid classifier
+INTENT_EXAMPLES = {
+    "instruction": [
+        "How do I make an espresso?",
+        "How do I turn on the machine?",
+        "How can I change the cup size?",
+        "How do I use the steam wand to froth milk?",
+        "How do I start a wash cycle?",
+        "How do I set the timer?",
+    ],
+    "setup": [
+        "How do I install the appliance?",
+        "How do I connect it to Wi-Fi?",
+        "How do I set up the device for the first time?",
+        "How do I connect the water supply?",
+        "How do I pair the remote control?",
+        "What do I need to do before first use?",
+    ],
+    "diagnosis": [
+        "Why is the machine not turning on?",
+        "What does error code E05 mean?",
+        "The coffee is coming out cold, what is wrong?",
+        "Why is water leaking from the bottom?",
+        "The display shows a flashing red light, how do I fix it?",
+        "It makes a loud noise and stops, what should I do?",
+    ],
+    "maintenance": [
+        "How do I descale the machine?",
+        "How often should I clean the filter?",
+        "How do I replace the water filter?",
+        "How do I clean the brew group?",
+        "When should I empty the drip tray?",
+        "How do I change the battery?",
+    ],
+    "explanation": [
+        "What does this icon mean?",
+        "What is the purpose of this button?",
+        "What does the blinking light indicate?",
+        "What is the eco mode?",
+        "What does this symbol on the display mean?",
+        "What are the technical specifications?",
+    ],
+    "safety": [
+        "Is it safe to use near water?",
+        "Can children use this appliance?",
+        "What are the safety warnings?",
+        "Can I put the parts in the dishwasher?",
+        "What should I never do with this device?",
+        "Is there a risk of electric shock?",
+    ],
+}
+
+
+# ---------------------------------------------------------
+# LOCAL NEAREST-CENTROID CLASSIFIER
+# ---------------------------------------------------------
+_centroids = None
+_centroids_lock = threading.Lock()
+
+
+def _intent_centroids() -> np.ndarray:
+    """(len(INTENTS) x dim) normalized mean embedding of each intent's examples."""
+    global _centroids
+    if _centroids is None:
+        with _centroids_lock:
+            if _centroids is None:
+                embedder = get_embedder()
+                _centroids = np.stack([
+                    l2_normalize(embedder.encode(INTENT_EXAMPLES[intent]).mean(axis=0))
+                    for intent in INTENTS
+                ])
+    return _centroids
+
 
+def classify_task_local(question: str, question_vector: np.ndarray | None = None) -> str:
+    """
+    Classify intent without an LLM call: cosine nearest centroid over
+    MiniLM embeddings. Pass question_vector to reuse the retrieval embedding.
+    """
+    if question_vector is None:
+        question_vector = get_embedder().embed_query(question)
+
+    sims = _intent_centroids() @ l2_normalize(question_vector)
+    return INTENTS[int(np.argmax(sims))]
+
+
+# ---------------------------------------------------------
+# GEMINI CLASSIFIER
+# ---------------------------------------------------------
 def classify_task(question: str) -> str:
     """
     Classify the user's question into a general intent category.
@@ -26,9 +122,12 @@ def classify_task(question: str) -> str:
         response = model.generate_content(prompt)
         intent = response.text.strip().lower()
 
-        allowed = ["instruction", "setup", "diagnosis", "maintenance", "explanation", "safety"]
-        return intent if intent in allowed else "explanation"
+        return intent if intent in INTENTS else "explanation"
 
     except Exception as e:
         print(f"⚠️ Intent classification failed: {e}")
         return "explanation"
+
+
+def uses_local_classifier() -> bool:
+    return INTENT_CLASSIFIER == "local"
@@ -0,0 +1,170 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # faiss-cpu is optional, numpy scoring is the fallback
+    faiss = None
+
+from app.core.config import VECTOR_INDEX, IVF_NLIST, IVF_NPROBE, HNSW_M, HNSW_EF_SEARCH
+from app.rag.embedding_store import load_binary_store, l2_normalize
+
+# Persisted next to embeddings.npy / chunks.jsonl
+INDEX_FILE = "faiss.index"
+INDEX_META_FILE = "faiss_index.json"
+
+INDEX_KINDS = ("flat", "ivf", "hnsw")
+
+# FAISS wants ~39 training points per IVF list; below this IVF is pointless
+IVF_MIN_POINTS_PER_LIST = 39
+
+
+def faiss_available() -> bool:
+    return faiss is not None
+
+
+# ---------------------------------------------------------
+# BUILD
+# ---------------------------------------------------------
+def _auto_nlist(n: int) -> int:
+    return max(1, int(4 * np.sqrt(n)))
+
+
+def build_index(embeddings: np.ndarray, kind: str):
+    """
+    Build an inner-product FAISS index over L2-normalized vectors
+    (inner product == cosine similarity).
+    IVF silently degrades to exact flat search when there are too few
+    vectors to train the coarse quantizer.
+    """
+    if faiss is None:
+        raise ImportError("faiss-cpu is not installed; set VECTOR_INDEX=numpy or install faiss-cpu")
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown VECTOR_INDEX '{kind}', expected one of {INDEX_KINDS}")
+
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, dim = vectors.shape
+
+    if kind == "ivf":
+        nlist = IVF_NLIST or _auto_nlist(n)
+        if n < nlist * IVF_MIN_POINTS_PER_LIST:
+            kind = "flat"
+
+    if kind == "flat":
+        index = faiss.IndexFlatIP(dim)
+
+    elif kind == "ivf":
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.nprobe = IVF_NPROBE
+
+    else:
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+
+    index.add(vectors)
+    return index, kind
+
+
+def build_and_save_index(store_dir: str, kind: str = VECTOR_INDEX) -> str | None:
+    """
+    Build the configured index from the binary store in store_dir and
+    persist it as faiss.index. Returns the index path, or None when
+    indexing is disabled (VECTOR_INDEX=numpy) or faiss is missing.
+    """
+    store_dir = Path(store_dir)
+    index_path = store_dir / INDEX_FILE
+    meta_path = store_dir / INDEX_META_FILE
+
+    # Never leave a stale index next to freshly written embeddings
+    index_path.unlink(missing_ok=True)
+    meta_path.unlink(missing_ok=True)
+
+    if kind == "numpy":
+        return None
+    if faiss is None:
+        print("⚠️ faiss-cpu not installed, skipping ANN index (numpy search will be used).")
+        return None
+
+    embeddings, _, manifest = load_binary_store(str(store_dir))
+    if not manifest.get("normalized"):
+        embeddings = l2_normalize(embeddings)
+
+    if len(embeddings) == 0:
+        return None
+
+    index, built_kind = build_index(embeddings, kind)
+    faiss.write_index(index, str(index_path))
+
+    # load_index only uses the file for the same VECTOR_INDEX and store shape
+    meta_path.write_text(json.dumps({
+        "kind": built_kind,
+        "requested": kind,
+        "count": int(index.ntotal),
+        "dim": int(index.d),
+    }, indent=2), encoding="utf-8")
+
+    print(f"✓ Built FAISS {built_kind} index ({index.ntotal} vectors): {index_path}")
+    return str(index_path)
+
+
+# ---------------------------------------------------------
+# LOAD + SEARCH
+# ---------------------------------------------------------
+class FaissIndex:
+    """Thin wrapper so LocalVectorStore does not touch faiss directly."""
+
+    def __init__(self, index, kind: str):
+        self.index = index
+        self.kind = kind
+        self.ntotal = int(index.ntotal)
+
+    def search(self, queries: np.ndarray, top_k: int):
+        """
+        queries: (n x dim) L2-normalized float32.
+        Returns (scores, ids), both (n x top_k); missing hits have id -1.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        return self.index.search(queries, top_k)
+
+
+def load_index(store_dir: str, count: int, dim: int, kind: str = VECTOR_INDEX) -> FaissIndex | None:
+    """
+    Open faiss.index from store_dir, memory-mapped where the index type
+    supports it. Returns None if VECTOR_INDEX does not select FAISS, faiss
+    is missing, or there is no index built with this VECTOR_INDEX for a
+    store of count x dim vectors.
+    """
+    store_dir = Path(store_dir)
+    index_path = store_dir / INDEX_FILE
+    meta_path = store_dir / INDEX_META_FILE
+
+    if kind not in INDEX_KINDS or faiss is None:
+        return None
+    if not index_path.exists() or not meta_path.exists():
+        return None
+
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if (meta.get("requested"), meta.get("count"), meta.get("dim")) != (kind, count, dim):
+        print(f"⚠️ Ignoring stale FAISS index in {store_dir}")
+        return None
+
+    try:
+        index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP)
+    except RuntimeError:
+        # Not every index type can be mapped (e.g. HNSW graph links)
+        index = faiss.read_index(str(index_path))
+
+    if (index.ntotal, index.d) != (count, dim):
+        print(f"⚠️ Ignoring FAISS index in {store_dir}: it does not match its metadata")
+        return None
+
+    if meta["kind"] == "ivf":
+        faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+    elif meta["kind"] == "hnsw":
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+
+    return FaissIndex(index, meta["kind"])
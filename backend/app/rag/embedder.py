@@ -0,0 +1,139 @@
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_PATH,
+    EMBEDDING_MAX_LENGTH,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    QUERY_CACHE_PATH,
+)
+from app.core.paths import DATA_DIR
+from app.rag.query_cache import QueryEmbeddingCache
+
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+def default_onnx_dir(model_name: str) -> str:
+    return str(DATA_DIR / "models" / f"{model_name.replace('/', '_')}-onnx")
+
+
+class Embedder:
+    """
+    Process-wide wrapper around one embedding model.
+    The model is loaded on first use (or by warm_up()) and then shared
+    by the vector stores and the ingestion pipeline.
+    Query embeddings go through an LRU cache (see embed_query/embed_queries);
+    bulk chunk encoding via encode() bypasses it.
+
+    backend (EMBEDDING_BACKEND): "torch", "torch-int8" or "onnx".
+    threads > 0 pins the backend's intra-op thread count.
+    query_cache=False (ingestion workers) skips the query cache and its
+    persisted file.
+    """
+
+    def __init__(self, model_name: str, backend: str = EMBEDDING_BACKEND, threads: int = 0, query_cache: bool = True):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+        self.model_name = model_name
+        self.backend = backend
+        self.threads = threads
+        self._model = None
+        self._dim: int | None = None
+        self._lock = threading.Lock()
+
+        # Backends differ slightly in their vectors: persisted entries are
+        # only reused for the same model + backend
+        cache_tag = model_name if backend == "torch" else f"{model_name}:{backend}"
+        self.query_cache = QueryEmbeddingCache(
+            max_entries=QUERY_CACHE_SIZE if query_cache else 0,
+            ttl_seconds=QUERY_CACHE_TTL,
+            persist_path=QUERY_CACHE_PATH if query_cache and model_name == EMBEDDING_MODEL else "",
+            model_name=cache_tag,
+        )
+
+    def _load_model(self):
+        if self.backend == "onnx":
+            from app.rag.onnx_encoder import OnnxSentenceEncoder
+            return OnnxSentenceEncoder(
+                EMBEDDING_ONNX_PATH or default_onnx_dir(self.model_name),
+                max_length=EMBEDDING_MAX_LENGTH,
+                threads=self.threads,
+            )
+
+        # Imported lazily: torch is heavy and not every process needs it
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.threads > 0:
+            torch.set_num_threads(self.threads)
+
+        if self.backend == "torch-int8":
+            # Dynamic quantization is a CPU-only feature
+            model = SentenceTransformer(self.model_name, device="cpu")
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        return SentenceTransformer(self.model_name)
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load_model()
+                    print(f"✓ Embedding model {self.model_name} loaded ({self.backend})")
+        return self._model
+
+    @property
+    def dim(self) -> int:
+        """Vector size of the model (loads it on first use)."""
+        if self._dim is None:
+            self._dim = int(self.encode(["dim"]).shape[1])
+        return self._dim
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts into a (len(texts) x dim) float32 array."""
+        vectors = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        vector = self.query_cache.get(query)
+        if vector is None:
+            vector = self.encode([query])[0]
+            self.query_cache.put(query, vector)
+        return vector
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Cached lookups first, then one batched encode for all misses."""
+        cached = [self.query_cache.get(q) for q in queries]
+        misses = [i for i, v in enumerate(cached) if v is None]
+
+        if misses:
+            fresh = self.encode([queries[i] for i in misses])
+            for i, vector in zip(misses, fresh):
+                cached[i] = vector
+                self.query_cache.put(queries[i], vector)
+
+        return np.stack(cached)
+
+    def warm_up(self) -> None:
+        """Load weights and run one encode so the first real request is not cold."""
+        self.encode(["warm-up"])
+
+
+_embedders: Dict[str, Embedder] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(model_name: str = EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND) -> Embedder:
+    """Return the shared Embedder for model_name + backend (one per process)."""
+    key = f"{model_name}:{backend}"
+    with _embedders_lock:
+        if key not in _embedders:
+            _embedders[key] = Embedder(model_name, backend=backend)
+        return _embedders[key]
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from app.rag.embedder import Embedder
+
+# Per-process embedder, created by the pool initializer
+_worker_embedder = None
+
+
+def _init_embed_worker(model_name: str, threads: int):
+    global _worker_embedder
+
+    if threads > 0:
+        # Must be set before torch / onnxruntime initialize their thread pools
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[var] = str(threads)
+
+    # Same backend as the parent (EMBEDDING_BACKEND), pinned to `threads`;
+    # chunk encoding never goes through the query cache
+    _worker_embedder = Embedder(model_name, threads=threads, query_cache=False)
+    _worker_embedder.warm_up()
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    return _worker_embedder.encode(texts, batch_size=len(texts))
+
+
+class EmbeddingPool:
+    """
+    Fans chunk batches out over worker processes, each with its own copy
+    of the model and a fixed number of intra-op threads. For a small model
+    like MiniLM, N single-threaded processes scale far better than one
+    process with N intra-op threads.
+
+    map_batches() yields results strictly in submission order, so the
+    written store is identical to the single-process path.
+    """
+
+    def __init__(self, model_name: str, workers: int, threads_per_worker: int = 1):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_embed_worker,
+            initargs=(model_name, threads_per_worker),
+        )
+
+    def map_batches(self, batches: Iterable[List[str]]) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """(texts, vectors) per batch, in input order; keeps 2 batches per worker in flight."""
+        max_in_flight = 2 * self.workers
+        in_flight = deque()
+
+        for batch in batches:
+            in_flight.append((batch, self._pool.submit(_encode_batch, batch)))
+            if len(in_flight) >= max_in_flight:
+                texts, future = in_flight.popleft()
+                yield texts, future.result()
+
+        while in_flight:
+            texts, future = in_flight.popleft()
+            yield texts, future.result()
+
+    def close(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
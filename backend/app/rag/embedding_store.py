@@ -0,0 +1,221 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+# ---------------------------------------------------------
+# On-disk layout (inside each processed manual folder)
+# ---------------------------------------------------------
+# embeddings.npy        float32 matrix (num_chunks x dim), L2-normalized, memory-mappable
+# chunks.jsonl          one {"id", "text", "metadata"} record per row
+# embedding_store.json  small manifest (count, dim, dtype, model, normalized)
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.jsonl"
+MANIFEST_FILE = "embedding_store.json"
+
+LEGACY_JSON_FILE = "rag_chunks_with_embeddings.json"
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Row-wise L2 normalization (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def has_binary_store(store_dir: str) -> bool:
+    """True if store_dir contains a complete binary embedding store."""
+    store_dir = Path(store_dir)
+    return all(
+        (store_dir / name).exists()
+        for name in (EMBEDDINGS_FILE, CHUNKS_FILE, MANIFEST_FILE)
+    )
+
+
+# ---------------------------------------------------------
+# STREAMING WRITER
+# ---------------------------------------------------------
+class EmbeddingStoreWriter:
+    """
+    Writes chunks + embeddings incrementally:
+    - vectors are L2-normalized, so cosine search is a single dot product
+    - vectors are appended as raw float32 bytes to a temp file
+    - chunk text/metadata go line-by-line into chunks.jsonl
+    - close() prepends the .npy header so the matrix can be memory-mapped
+    Nothing is held in memory besides the current batch.
+
+    dim is taken from the first batch; set it (or pass it) when no batch
+    may come, so an empty store still records the model's vector size.
+    """
+
+    def __init__(self, out_dir: str, model_name: str | None = None, dim: int | None = None):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+
+        self._raw_path = self.out_dir / (EMBEDDINGS_FILE + ".raw")
+        self._chunks_tmp = self.out_dir / (CHUNKS_FILE + ".tmp")
+
+        self._raw = self._raw_path.open("wb")
+        self._chunks = self._chunks_tmp.open("w", encoding="utf-8")
+
+        self.count = 0
+        self.dim = dim
+
+    def add(self, records: List[Dict[str, Any]], vectors) -> None:
+        """Append one batch: records[i] = {"id", "text", "metadata"}, vectors[i] = embedding."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(records):
+            raise ValueError(
+                f"Expected {len(records)} vectors, got array of shape {vectors.shape}"
+            )
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dim changed from {self.dim} to {vectors.shape[1]}")
+
+        self._raw.write(np.ascontiguousarray(l2_normalize(vectors)).tobytes())
+        for record in records:
+            self._chunks.write(json.dumps(record) + "\n")
+
+        self.count += len(records)
+
+    def close(self) -> None:
+        """Finalize embeddings.npy, chunks.jsonl and the manifest."""
+        if self.dim is None:
+            self._discard()
+            raise ValueError(f"Embedding dim unknown for the empty store in {self.out_dir}")
+
+        self._raw.close()
+        self._chunks.close()
+
+        dim = self.dim
+        npy_tmp = self.out_dir / (EMBEDDINGS_FILE + ".tmp")
+
+        with npy_tmp.open("wb") as out, self._raw_path.open("rb") as raw:
+            np.lib.format.write_array_header_1_0(out, {
+                "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                "fortran_order": False,
+                "shape": (self.count, dim),
+            })
+            shutil.copyfileobj(raw, out)
+
+        self._raw_path.unlink()
+
+        # Swap in atomically so readers never see a half-written store
+        os.replace(npy_tmp, self.out_dir / EMBEDDINGS_FILE)
+        os.replace(self._chunks_tmp, self.out_dir / CHUNKS_FILE)
+
+        manifest = {
+            "count": self.count,
+            "dim": dim,
+            "dtype": "float32",
+            "model": self.model_name,
+            "normalized": True,
+        }
+        (self.out_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def _discard(self) -> None:
+        """Drop the temp files, leaving any previous store untouched."""
+        self._raw.close()
+        self._chunks.close()
+        self._raw_path.unlink(missing_ok=True)
+        self._chunks_tmp.unlink(missing_ok=True)
+
+
+class LegacyJsonWriter:
+    """
+    Streams the old rag_chunks_with_embeddings.json format
+    ([{"id", "text", "embedding", "metadata"}, ...]) for external tools.
+    Optional (WRITE_LEGACY_JSON): the app reads new manuals from the binary store.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._f = self._tmp.open("w", encoding="utf-8")
+        self._f.write("[\n")
+        self._first = True
+
+    def add(self, records: List[Dict[str, Any]], vectors) -> None:
+        for record, vector in zip(records, np.asarray(vectors, dtype=np.float32)):
+            if not self._first:
+                self._f.write(",\n")
+            self._first = False
+            self._f.write(json.dumps({**record, "embedding": vector.tolist()}))
+
+    def close(self) -> None:
+        self._f.write("\n]\n")
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            self._tmp.unlink(missing_ok=True)
+
+
+# ---------------------------------------------------------
+# READERS
+# ---------------------------------------------------------
+def load_binary_store(store_dir: str):
+    """
+    Open a binary store.
+    Returns (embeddings, chunks, manifest) where embeddings is a read-only
+    np.memmap, so several processes share one page-cache copy.
+    """
+    store_dir = Path(store_dir)
+
+    manifest = json.loads((store_dir / MANIFEST_FILE).read_text(encoding="utf-8"))
+    embeddings = np.load(store_dir / EMBEDDINGS_FILE, mmap_mode="r")
+
+    with (store_dir / CHUNKS_FILE).open("r", encoding="utf-8") as f:
+        chunks = [json.loads(line) for line in f if line.strip()]
+
+    if len(chunks) != embeddings.shape[0]:
+        raise ValueError(
+            f"Corrupt embedding store in {store_dir}: "
+            f"{len(chunks)} chunks vs {embeddings.shape[0]} vectors"
+        )
+
+    return embeddings, chunks, manifest
+
+
+def load_legacy_json(rag_json_path: str):
+    """
+    Fallback reader for rag_chunks_with_embeddings.json.
+    Returns (embeddings, chunks) with float32, L2-normalized embeddings.
+    """
+    with open(rag_json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    embeddings = l2_normalize(np.array([r["embedding"] for r in records], dtype=np.float32))
+    chunks = [
+        {
+            "id": r["id"],
+            "text": r["text"],
+            "metadata": r.get("metadata") or ({"section": r["section"]} if "section" in r else {}),
+        }
+        for r in records
+    ]
+
+    return embeddings, chunks
@@ -0,0 +1,160 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from app.core.config import MANUAL_CACHE_MB
+from app.core.paths import PROCESSED_DIR
+from app.rag.embedding_store import LEGACY_JSON_FILE, has_binary_store
+from app.rag.vector_store import LocalVectorStore
+
+
+class ManualRegistry:
+    """
+    All processed manuals, keyed by their folder name under
+    app/data/processed (the name process_pdf picks).
+
+    - Vector stores are loaded lazily on first use
+    - Loaded stores are kept in LRU order and evicted once their combined
+      size exceeds the memory budget (the active manual is never evicted)
+    - Loading one manual only blocks requests for that same manual
+    """
+
+    def __init__(self, processed_dir: Path = PROCESSED_DIR, memory_budget_mb: int = MANUAL_CACHE_MB):
+        self.processed_dir = Path(processed_dir)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+
+        self.active_manual_id: str | None = None
+
+        self._stores: "OrderedDict[str, LocalVectorStore]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # Bumped by invalidate(); a load that overlaps an invalidation is discarded
+        self._generations: Dict[str, int] = {}
+        self._invalidation_listeners: List[Callable[[str], None]] = []
+
+    # -------------------------------------------------
+    # Discovery
+    # -------------------------------------------------
+    def _rag_path(self, manual_id: str) -> Path:
+        return self.processed_dir / manual_id / LEGACY_JSON_FILE
+
+    def exists(self, manual_id: str) -> bool:
+        manual_dir = self.processed_dir / manual_id
+        # Reject path tricks like "../uploads"
+        if manual_dir.resolve().parent != self.processed_dir.resolve():
+            return False
+        return has_binary_store(str(manual_dir)) or self._rag_path(manual_id).exists()
+
+    def list_manuals(self) -> List[Dict]:
+        with self._lock:
+            loaded = set(self._stores)
+
+        return [
+            {
+                "manual_id": d.name,
+                "loaded": d.name in loaded,
+                "active": d.name == self.active_manual_id,
+            }
+            for d in sorted(self.processed_dir.iterdir())
+            if d.is_dir() and self.exists(d.name)
+        ]
+
+    # -------------------------------------------------
+    # Lookup
+    # -------------------------------------------------
+    def get(self, manual_id: str | None = None) -> LocalVectorStore | None:
+        """
+        Return the vector store for manual_id (or the active manual),
+        loading it on first use. None if the manual does not exist.
+        """
+        manual_id = manual_id or self.active_manual_id
+        if manual_id is None:
+            return None
+
+        with self._lock:
+            store = self._stores.get(manual_id)
+            if store is not None:
+                self._stores.move_to_end(manual_id)
+                return store
+
+        if not self.exists(manual_id):
+            return None
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(manual_id, threading.Lock())
+
+        # Only one thread loads a given manual; others wait for it
+        with load_lock:
+            with self._lock:
+                store = self._stores.get(manual_id)
+            if store is not None:
+                return store
+
+            while True:
+                with self._lock:
+                    generation = self._generations.get(manual_id, 0)
+
+                store = LocalVectorStore(str(self._rag_path(manual_id)))
+
+                with self._lock:
+                    if self._generations.get(manual_id, 0) == generation:
+                        self._stores[manual_id] = store
+                        self._evict()
+                        break
+
+                # Re-ingested while loading: the files just read may be stale
+                print(f"↻ Manual '{manual_id}' changed while loading, reloading")
+
+            print(f"✓ Loaded manual '{manual_id}' ({len(store.ids)} chunks)")
+
+        return store
+
+    def set_active(self, manual_id: str) -> None:
+        self.active_manual_id = manual_id
+
+    def activate(self, manual_id: str) -> None:
+        """A manual was (re-)ingested: drop stale copies and make it the default."""
+        self.invalidate(manual_id)
+        self.set_active(manual_id)
+
+    def invalidate(self, manual_id: str) -> None:
+        """
+        Drop a cached store (e.g. after re-ingestion) so the next get() reloads it,
+        and notify listeners (answer cache) that the manual's content changed.
+        """
+        with self._lock:
+            self._stores.pop(manual_id, None)
+            self._generations[manual_id] = self._generations.get(manual_id, 0) + 1
+            listeners = list(self._invalidation_listeners)
+
+        for listener in listeners:
+            listener(manual_id)
+
+    def add_invalidation_listener(self, listener: Callable[[str], None]) -> None:
+        with self._lock:
+            self._invalidation_listeners.append(listener)
+
+    # -------------------------------------------------
+    # Eviction
+    # -------------------------------------------------
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(s.memory_bytes() for s in self._stores.values())
+
+    def _evict(self) -> None:
+        """Evict cold stores until under budget. Caller holds self._lock."""
+        total = sum(s.memory_bytes() for s in self._stores.values())
+
+        for manual_id in list(self._stores):
+            if total <= self.memory_budget or len(self._stores) <= 1:
+                break
+            if manual_id == self.active_manual_id:
+                continue
+
+            total -= self._stores.pop(manual_id).memory_bytes()
+            print(f"♻️ Evicted manual '{manual_id}' from memory")
+
+
+# Process-wide registry shared by all routers
+registry = ManualRegistry()
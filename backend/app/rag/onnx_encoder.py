@@ -0,0 +1,73 @@
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+# Files expected in an exported model folder
+# (see benchmarks/embedding_parity.py --export-onnx)
+ONNX_MODEL_FILE = "model.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxSentenceEncoder:
+    """
+    Torch-free sentence encoder: onnxruntime runs an exported transformer,
+    the `tokenizers` library tokenizes, and token embeddings are mean-pooled
+    over the attention mask (the SentenceTransformer pooling of MiniLM).
+
+    encode() mirrors SentenceTransformer.encode so Embedder can use either.
+    """
+
+    def __init__(self, model_dir: str, max_length: int = 256, threads: int = 0):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=onnx needs the onnxruntime and tokenizers packages"
+            ) from e
+
+        model_dir = Path(model_dir)
+        if not (model_dir / ONNX_MODEL_FILE).exists():
+            raise FileNotFoundError(
+                f"No {ONNX_MODEL_FILE} in {model_dir}. Export one with "
+                f"`python -m benchmarks.embedding_parity --export-onnx {model_dir}`"
+            )
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_dir / ONNX_MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]  # (batch, tokens, dim)
+
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        batches = [
+            self._encode_batch(texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        ]
+        return np.concatenate(batches).astype(np.float32, copy=False)
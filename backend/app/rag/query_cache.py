@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Cache key: collapse whitespace so trivial variants share an entry."""
+    return " ".join(text.split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache: query text → embedding vector.
+    - max_entries: LRU bound (0 disables caching)
+    - ttl_seconds: entries older than this are treated as misses (0 = never expire)
+    - persist_path: optional .npz file loaded on start and written by save()
+      (tagged with model_name, ignored if the embedding model changed)
+    Hit/miss counters are exposed through stats() for sizing from real traffic.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int = 0, persist_path: str = "", model_name: str = ""):
+        # Persisted vectors are only reused for the model that produced them
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = Path(persist_path) if persist_path else None
+
+        self._entries: "OrderedDict[str, tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.persist_path is not None and self.persist_path.exists():
+            self.load()
+
+    def get(self, text: str):
+        key = normalize_query(text)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and self.ttl_seconds and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, text: str, vector: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+
+        key = normalize_query(text)
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)  # shared between callers
+
+        with self._lock:
+            self._entries[key] = (time.time(), vector)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "persist_path": str(self.persist_path) if self.persist_path else None,
+            }
+
+    # -------------------------------------------------
+    # Persistence (.npz: keys, timestamps, vectors)
+    # -------------------------------------------------
+    def save(self) -> None:
+        if self.persist_path is None:
+            return
+
+        with self._lock:
+            if not self._entries:
+                return
+            keys = list(self._entries)
+            stamps = np.array([self._entries[k][0] for k in keys], dtype=np.float64)
+            vectors = np.stack([self._entries[k][1] for k in keys])
+
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.persist_path.with_name(self.persist_path.stem + ".tmp.npz")
+        np.savez(tmp, model=np.array(self.model_name), keys=np.array(keys, dtype=str), stamps=stamps, vectors=vectors)
+        tmp.replace(self.persist_path)
+
+    def load(self) -> None:
+        try:
+            data = np.load(self.persist_path)
+            model, keys, stamps, vectors = str(data["model"]), data["keys"], data["stamps"], data["vectors"]
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠️ Could not load query cache {self.persist_path}: {e}")
+            return
+
+        if model != self.model_name:
+            print(f"⚠️ Query cache {self.persist_path} was built with '{model}', ignoring it")
+            return
+
+        for key, stamp, vector in zip(keys, stamps, vectors):
+            if self.ttl_seconds and time.time() - stamp > self.ttl_seconds:
+                continue
+            vector = np.array(vector, dtype=np.float32)
+            vector.setflags(write=False)
+            self._entries[str(key)] = (float(stamp), vector)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        print(f"✓ Loaded {len(self._entries)} cached query embeddings from {self.persist_path}")
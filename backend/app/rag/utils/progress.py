@@ -1,15 +1,198 @@
-import json
-from pathlib import Path
+import threading
+import time
+from typing import Any, Dict, List
 
-PROGRESS_FILE = Path("logs/ingest_progress.json")
+# Ingestion stages, in pipeline order
+STAGES = ["render", "detect", "dedup", "classify", "merge", "chunk", "embed"]
 
-def update_progress(phase: str, progress: int):
-    data = {
-        "phase": phase,
-        "progress": progress
-    }
-    with open(PROGRESS_FILE, "w") as f:
-        json.dump(data, f)
+# Job id used when the pipeline runs outside the job manager (CLI, scripts)
+LOCAL_JOB_ID = "local"
 
-def reset_progress():
-    update_progress("idle", 0)
+
+# ---------------------------------------------------------
+# IN-MEMORY TRACKER (lives in the API process)
+# ---------------------------------------------------------
+class ProgressTracker:
+    """
+    Progress of every ingestion job, keyed by job id.
+    Each stage records done/total (pages, icons, chunks...), throughput
+    and ETA. Workers send events (see stage_* below), the tracker applies
+    them; nothing is written to disk.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _job(self, job_id: str) -> Dict[str, Any]:
+        if job_id not in self._jobs:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "phase": "queued",
+                "error": None,
+                "stages": {},
+                "updated_at": time.time(),
+                "version": 0,
+            }
+        return self._jobs[job_id]
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            job = self._job(event["job_id"])
+            kind = event["kind"]
+            now = event["time"]
+
+            if kind == "phase":
+                job["phase"] = event["phase"]
+                if event.get("error"):
+                    job["error"] = event["error"]
+
+            else:
+                stage = job["stages"].setdefault(event["stage"], {
+                    "status": "running",
+                    "done": 0,
+                    "total": None,
+                    "unit": "items",
+                    "started_at": now,
+                    "finished_at": None,
+                })
+
+                if kind == "start":
+                    stage.update(status="running", done=0, started_at=now, finished_at=None)
+                    stage["total"] = event.get("total")
+                    stage["unit"] = event.get("unit", stage["unit"])
+                elif kind == "advance":
+                    stage["done"] += event["n"]
+                elif kind == "total":
+                    stage["total"] = event["total"]
+                elif kind == "done":
+                    stage.update(status="done", finished_at=now)
+                    # Counted stages: the real count replaces any estimate.
+                    # Stages that never advanced just report their total.
+                    if stage["done"]:
+                        stage["total"] = stage["done"]
+                    else:
+                        stage["done"] = stage["total"] or 0
+                elif kind == "skip":
+                    # Nothing to do (e.g. unchanged manual): counts as complete
+                    stage.update(status="skipped", finished_at=now)
+
+                stage["updated_at"] = now
+
+            job["updated_at"] = now
+            job["version"] += 1
+
+    @staticmethod
+    def _stage_view(stage: Dict[str, Any], now: float) -> Dict[str, Any]:
+        end = stage["finished_at"] or now
+        elapsed = max(end - stage["started_at"], 1e-9)
+        rate = stage["done"] / elapsed if stage["done"] else 0.0
+
+        eta = None
+        if stage["status"] == "running" and stage["total"] and rate > 0:
+            eta = max(stage["total"] - stage["done"], 0) / rate
+
+        percent = None
+        if stage["total"]:
+            percent = min(100.0, 100.0 * stage["done"] / stage["total"])
+        elif stage["status"] in ("done", "skipped"):
+            percent = 100.0
+
+        return {
+            "status": stage["status"],
+            "done": stage["done"],
+            "total": stage["total"],
+            "unit": stage["unit"],
+            "percent": round(percent, 1) if percent is not None else None,
+            "throughput": round(rate, 2),  # units per second
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "elapsed_seconds": round(elapsed, 1),
+        }
+
+    def snapshot(self, job_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            now = time.time()
+            stages = {name: self._stage_view(s, now) for name, s in job["stages"].items()}
+
+            # Overall progress: every pipeline stage weighs the same
+            fractions = [
+                (stages[name]["percent"] or 0.0) / 100.0 if name in stages else 0.0
+                for name in STAGES
+            ]
+
+            return {
+                "job_id": job_id,
+                "phase": job["phase"],
+                "error": job["error"],
+                "progress": round(100.0 * sum(fractions) / len(STAGES), 1),
+                "stages": stages,
+                "updated_at": job["updated_at"],
+                "version": job["version"],
+            }
+
+    def version(self, job_id: str) -> int:
+        """Change counter of a job's progress (cheap, for pollers)."""
+        with self._lock:
+            return self._jobs.get(job_id, {}).get("version", 0)
+
+    def forget(self, job_ids: List[str]) -> None:
+        with self._lock:
+            for job_id in job_ids:
+                self._jobs.pop(job_id, None)
+
+
+progress_tracker = ProgressTracker()
+
+
+# ---------------------------------------------------------
+# REPORTING (called from the ingestion pipeline)
+# ---------------------------------------------------------
+# Inside a job worker process, events go through a multiprocessing queue
+# to the API process; otherwise they are applied to the local tracker.
+_job_id: str = LOCAL_JOB_ID
+_queue = None
+
+
+def bind_job(job_id: str, queue) -> None:
+    """Route this process's progress events to the job manager's queue."""
+    global _job_id, _queue
+    _job_id = job_id
+    _queue = queue
+
+
+def _emit(kind: str, **data) -> None:
+    event = {"job_id": _job_id, "kind": kind, "time": time.time(), **data}
+    if _queue is not None:
+        _queue.put(event)
+    else:
+        progress_tracker.apply(event)
+
+
+def stage_start(stage: str, total: int | None = None, unit: str = "items") -> None:
+    _emit("start", stage=stage, total=total, unit=unit)
+
+
+def stage_advance(stage: str, n: int = 1) -> None:
+    _emit("advance", stage=stage, n=n)
+
+
+def stage_total(stage: str, total: int) -> None:
+    """Update a stage's total (e.g. when it started from an estimate)."""
+    _emit("total", stage=stage, total=total)
+
+
+def stage_done(stage: str) -> None:
+    _emit("done", stage=stage)
+
+
+def stage_skipped(stage: str) -> None:
+    _emit("skip", stage=stage)
+
+
+def update_progress(phase: str, error: str | None = None) -> None:
+    """Job-level phase: "running", "complete", "error"..."""
+    _emit("phase", phase=phase, error=error)
@@ -0,0 +1,238 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import VECTOR_STORAGE, PQ_SUBVECTORS
+from app.rag.embedding_store import load_binary_store, l2_normalize
+
+# ---------------------------------------------------------
+# On-disk layout (next to embeddings.npy, which stays the exact copy)
+# ---------------------------------------------------------
+# vectors_f16.npy                     float16 matrix
+# vectors_i8.npy + vectors_i8_scale.npy int8 codes + one float32 scale per row
+# pq_codes.npy + pq_codebooks.npy       uint8 (N x m) codes + (m x 256 x dim/m) centroids
+# vector_storage.json                 {kind, count, dim, ...}
+STORAGE_META_FILE = "vector_storage.json"
+
+STORAGE_KINDS = ("float32", "float16", "int8", "pq")
+
+PQ_CENTROIDS = 256  # one uint8 code per subvector
+PQ_TRAIN_SAMPLE = 20000
+PQ_KMEANS_ITERS = 15
+
+# Rows scored per step; keeps float32 temporaries small
+SCORE_BLOCK_ROWS = 65536
+
+_FILES = {
+    "float16": ("vectors_f16.npy",),
+    "int8": ("vectors_i8.npy", "vectors_i8_scale.npy"),
+    "pq": ("pq_codes.npy", "pq_codebooks.npy"),
+}
+
+
+# ---------------------------------------------------------
+# QUANTIZERS
+# ---------------------------------------------------------
+def quantize_int8(vectors: np.ndarray):
+    """Symmetric per-row scalar quantization → (int8 codes, float32 scales)."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def pq_subvectors(dim: int, requested: int) -> int:
+    """Largest m <= requested that divides dim."""
+    for m in range(min(requested, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _kmeans(data: np.ndarray, k: int, iters: int, rng) -> np.ndarray:
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(iters):
+        d = (data ** 2).sum(1)[:, None] - 2 * data @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        assign = d.argmin(1)
+
+        counts = np.bincount(assign, minlength=k)
+        sums = np.stack([np.bincount(assign, weights=data[:, j], minlength=k) for j in range(data.shape[1])], axis=1)
+
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Empty clusters restart on random points
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.integers(len(data), size=len(empty))]
+
+    return centroids
+
+
+def train_pq(vectors: np.ndarray, m: int, seed: int = 0) -> np.ndarray:
+    """Train m codebooks of up to 256 centroids → (m x k x dim/m) float32."""
+    rng = np.random.default_rng(seed)
+    n, dim = vectors.shape
+    dsub = dim // m
+    k = min(PQ_CENTROIDS, n)
+
+    sample = vectors[rng.choice(n, min(n, PQ_TRAIN_SAMPLE), replace=False)]
+    return np.stack([
+        _kmeans(sample[:, j * dsub:(j + 1) * dsub], k, PQ_KMEANS_ITERS, rng)
+        for j in range(m)
+    ]).astype(np.float32)
+
+
+def pq_encode(vectors: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Nearest centroid per subvector → (N x m) uint8 codes."""
+    m, _, dsub = codebooks.shape
+    codes = np.empty((len(vectors), m), dtype=np.uint8)
+
+    for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+        block = vectors[start:start + SCORE_BLOCK_ROWS]
+        for j in range(m):
+            sub = block[:, j * dsub:(j + 1) * dsub]
+            cb = codebooks[j]
+            d = (sub ** 2).sum(1)[:, None] - 2 * sub @ cb.T + (cb ** 2).sum(1)[None, :]
+            codes[start:start + len(block), j] = d.argmin(1)
+
+    return codes
+
+
+# ---------------------------------------------------------
+# BUILD
+# ---------------------------------------------------------
+def build_compressed_vectors(store_dir: str, kind: str = VECTOR_STORAGE) -> str | None:
+    """
+    Write the compressed copy of embeddings.npy selected by kind
+    (VECTOR_STORAGE). embeddings.npy itself is kept: it is the exact
+    source for re-ranking. Returns the metadata path, or None for float32.
+    """
+    if kind not in STORAGE_KINDS:
+        raise ValueError(f"Unknown VECTOR_STORAGE '{kind}', expected one of {STORAGE_KINDS}")
+
+    store_dir = Path(store_dir)
+    meta_path = store_dir / STORAGE_META_FILE
+
+    # Never leave stale compressed vectors next to fresh embeddings
+    meta_path.unlink(missing_ok=True)
+    for names in _FILES.values():
+        for name in names:
+            (store_dir / name).unlink(missing_ok=True)
+
+    if kind == "float32":
+        return None
+
+    embeddings, _, manifest = load_binary_store(str(store_dir))
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if not manifest.get("normalized"):
+        vectors = l2_normalize(vectors)
+
+    if len(vectors) == 0:
+        return None
+
+    meta = {"kind": kind, "count": int(len(vectors)), "dim": int(vectors.shape[1])}
+
+    if kind == "float16":
+        np.save(store_dir / "vectors_f16.npy", vectors.astype(np.float16))
+
+    elif kind == "int8":
+        codes, scales = quantize_int8(vectors)
+        np.save(store_dir / "vectors_i8.npy", codes)
+        np.save(store_dir / "vectors_i8_scale.npy", scales)
+
+    else:
+        m = pq_subvectors(vectors.shape[1], PQ_SUBVECTORS)
+        codebooks = train_pq(vectors, m)
+        np.save(store_dir / "pq_codebooks.npy", codebooks)
+        np.save(store_dir / "pq_codes.npy", pq_encode(vectors, codebooks))
+        meta["subvectors"] = m
+
+    meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    print(f"✓ Wrote {kind} vectors ({len(vectors)} x {vectors.shape[1]}): {store_dir}")
+    return str(meta_path)
+
+
+# ---------------------------------------------------------
+# LOAD + SCORE
+# ---------------------------------------------------------
+class CompressedVectors:
+    """
+    Approximate cosine scoring over compressed vectors held in RAM.
+    scores() returns (queries x N) float32; callers re-rank the best
+    candidates against the exact float32 rows.
+    """
+
+    def __init__(self, kind: str, arrays: dict):
+        self.kind = kind
+        self.arrays = arrays
+        self.count = len(arrays["vectors"] if kind == "float16" else arrays["codes"])
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in self.arrays.values()))
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        """q: (queries x dim) L2-normalized float32."""
+        q = np.asarray(q, dtype=np.float32)
+        out = np.empty((len(q), self.count), dtype=np.float32)
+
+        if self.kind == "pq":
+            codebooks = self.arrays["codebooks"]
+            codes = self.arrays["codes"]
+            m, _, dsub = codebooks.shape
+
+            # Asymmetric distance: (queries x m x 256) table of partial dot products
+            lut = np.einsum("qmd,mkd->qmk", q.reshape(len(q), m, dsub), codebooks)
+            sub = np.arange(m)
+            block = max(1024, SCORE_BLOCK_ROWS * 8 // (len(q) * m))
+            for start in range(0, self.count, block):
+                c = codes[start:start + block]
+                out[:, start:start + len(c)] = lut[:, sub, c].sum(-1)
+            return out
+
+        for start in range(0, self.count, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, self.count)
+            if self.kind == "float16":
+                out[:, start:stop] = q @ self.arrays["vectors"][start:stop].astype(np.float32).T
+            else:
+                out[:, start:stop] = (
+                    q @ self.arrays["codes"][start:stop].astype(np.float32).T
+                ) * self.arrays["scales"][start:stop]
+        return out
+
+
+def load_compressed_vectors(store_dir: str, kind: str = VECTOR_STORAGE) -> CompressedVectors | None:
+    """
+    Load the compressed vectors of kind from store_dir.
+    Returns None for float32, or when they are missing / were built as
+    another kind (the store then falls back to exact float32 scoring).
+    """
+    if kind == "float32":
+        return None
+
+    store_dir = Path(store_dir)
+    meta_path = store_dir / STORAGE_META_FILE
+    if not meta_path.exists():
+        return None
+
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if meta.get("kind") != kind:
+        return None
+
+    if kind == "float16":
+        arrays = {"vectors": np.load(store_dir / "vectors_f16.npy")}
+    elif kind == "int8":
+        arrays = {
+            "codes": np.load(store_dir / "vectors_i8.npy"),
+            "scales": np.load(store_dir / "vectors_i8_scale.npy"),
+        }
+    else:
+        arrays = {
+            "codes": np.load(store_dir / "pq_codes.npy"),
+            "codebooks": np.load(store_dir / "pq_codebooks.npy"),
+        }
+
+    return CompressedVectors(kind, arrays)
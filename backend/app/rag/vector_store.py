@@ -1,35 +1,172 @@
-import json
+from pathlib import Path
+from typing import List
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from numpy.linalg import norm
 
-from app.core.config import EMBEDDING_MODEL
+from app.rag.embedder import get_embedder
+from app.rag.embedding_store import has_binary_store, load_binary_store, load_legacy_json, l2_normalize
+from app.rag.ann_index import load_index
+from app.rag.vector_compression import load_compressed_vectors
+from app.core.config import VECTOR_RERANK, VECTOR_STORAGE
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, best first.
+    Works on a 1-D score vector or row-wise on a (queries x N) matrix.
+    argpartition is O(N); only the k winners get sorted.
+    """
+    n = scores.shape[-1]
+    if top_k >= n:
+        return np.argsort(-scores, axis=-1)
+
+    idx = np.argpartition(-scores, top_k - 1, axis=-1)[..., :top_k]
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=-1), axis=-1)
+    return np.take_along_axis(idx, order, axis=-1)
+
 
 class LocalVectorStore:
-    def __init__(self, rag_json_path: str):
-        # Load chunks + embeddings
-        with open(rag_json_path, "r", encoding="utf-8") as f:
-            self.records = json.load(f)
+    def __init__(self, rag_json_path: str, storage: str = VECTOR_STORAGE, rerank: int = VECTOR_RERANK):
+        # Prefer the memory-mapped binary store written next to the JSON file,
+        # fall back to parsing rag_chunks_with_embeddings.json
+        store_dir = Path(rag_json_path).parent
+
+        # Row norms are handled once here, never per query:
+        # new stores are written L2-normalized, older binary stores get
+        # their inverse norms computed at load time.
+        self.inv_norms = None
+
+        # Optional FAISS index persisted next to the chunk file
+        self.index = None
 
-        self.embeddings = np.array([r["embedding"] for r in self.records])
-        self.texts = [r["text"] for r in self.records]
-        self.ids = [r["id"] for r in self.records]
+        # Optional compressed copy (VECTOR_STORAGE) scored instead of the
+        # float32 rows; only the re-ranked candidates touch the exact matrix
+        self.compressed = None
+        self.rerank = rerank
 
-        self.embedder = SentenceTransformer(EMBEDDING_MODEL)
+        if has_binary_store(str(store_dir)):
+            self.embeddings, chunks, manifest = load_binary_store(str(store_dir))
+            if not manifest.get("normalized"):
+                norms = np.linalg.norm(self.embeddings, axis=1)
+                norms[norms == 0] = 1.0
+                self.inv_norms = (1.0 / norms).astype(np.float32)
+
+            self.index = load_index(str(store_dir), len(chunks), self.embeddings.shape[1])
+
+            self.compressed = load_compressed_vectors(str(store_dir), storage)
+            if self.compressed is not None and self.compressed.count != len(chunks):
+                print(f"⚠️ Ignoring stale {self.compressed.kind} vectors in {store_dir}")
+                self.compressed = None
+        else:
+            self.embeddings, chunks = load_legacy_json(rag_json_path)
+
+        self.texts = [c["text"] for c in chunks]
+        self.ids = [c["id"] for c in chunks]
+        self.metadata = [c.get("metadata", {}) for c in chunks]
+
+        # Shared, process-wide model (loaded once, not per manual)
+        self.embedder = get_embedder()
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size, used by the manual registry's LRU budget."""
+        vectors = self.compressed.nbytes if self.compressed is not None else self.embeddings.nbytes
+        return int(vectors) + sum(len(t) for t in self.texts)
 
     def embed_query(self, query: str):
-        return self.embedder.encode([query])[0]
+        return self.embedder.embed_query(query)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode all (uncached) queries in one forward pass."""
+        return self.embedder.embed_queries(queries)
 
-    def search(self, query: str, top_k: int = 5):
-        q = self.embed_query(query)
-        sims = (self.embeddings @ q) / (norm(self.embeddings, axis=1) * norm(q))
-        idx = np.argsort(-sims)[:top_k]
+    def _score(self, q: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of normalized query vector(s) against every row.
+        q is (dim,) or (queries x dim); the latter is one matrix-matrix product.
+        """
+        sims = l2_normalize(q) @ self.embeddings.T
+        if self.inv_norms is not None:
+            sims *= self.inv_norms
+        return sims
 
+    def _top_k(self, q: np.ndarray, top_k: int):
+        """
+        (queries x dim) → (scores, idx), each (queries x top_k), best first.
+        Uses the FAISS index when one is loaded, brute-force numpy otherwise.
+        """
+        if self.index is not None:
+            scores, idx = self.index.search(l2_normalize(q), top_k)
+            return scores, idx
+
+        if self.compressed is not None:
+            return self._compressed_top_k(l2_normalize(q), top_k)
+
+        sims = self._score(q)
+        idx = top_k_indices(sims, top_k)
+        return np.take_along_axis(sims, idx, axis=-1), idx
+
+    def _compressed_top_k(self, q: np.ndarray, top_k: int):
+        """
+        Approximate scores from the compressed vectors, then the best
+        `rerank` candidates are re-scored exactly against the float32 rows
+        (read from the memory-mapped embeddings.npy).
+        """
+        approx = self.compressed.scores(q)
+        if not self.rerank:
+            idx = top_k_indices(approx, top_k)
+            return np.take_along_axis(approx, idx, axis=-1), idx
+
+        candidates = top_k_indices(approx, max(top_k, self.rerank))
+        exact = np.empty(candidates.shape, dtype=np.float32)
+
+        for row, cand in enumerate(candidates):
+            # Ascending row order: sequential reads from the memmap
+            order = np.argsort(cand)
+            rows = cand[order]
+            scores = np.asarray(self.embeddings[rows], dtype=np.float32) @ q[row]
+            if self.inv_norms is not None:
+                scores *= self.inv_norms[rows]
+            exact[row, order] = scores
+
+        best = top_k_indices(exact, top_k)
+        return np.take_along_axis(exact, best, axis=-1), np.take_along_axis(candidates, best, axis=-1)
+
+    def _results(self, scores: np.ndarray, idx: np.ndarray):
         return [
             {
                 "id": self.ids[i],
-                "score": float(sims[i]),
+                "score": float(score),
                 "text": self.texts[i]
             }
-            for i in idx
-        ]
\ No newline at end of file
+            for score, i in zip(scores, idx)
+            if i >= 0
+        ]
+
+    def search(self, query: str, top_k: int = 5, query_vector: np.ndarray | None = None):
+        """query_vector: embedding of query if the caller already has it (skips the encode)."""
+        if not self.ids:
+            # Manual without any text: nothing to score against
+            return []
+
+        if query_vector is None:
+            query_vector = self.embed_query(query)
+        scores, idx = self._top_k(query_vector[None, :], top_k)
+        return self._results(scores[0], idx[0])
+
+    def search_many(self, queries: List[str], top_k: int = 5, query_vectors: np.ndarray | None = None):
+        """
+        Batched search: one encode call for all queries and one
+        (queries x dim) @ (dim x N) product (or one FAISS call) for scoring.
+        query_vectors: (queries x dim) embeddings if the caller already has them.
+        Returns one result list per query, in input order.
+        """
+        if not queries:
+            return []
+        if not self.ids:
+            return [[] for _ in queries]
+
+        if query_vectors is None:
+            query_vectors = self.embed_queries(queries)
+        scores, idx = self._top_k(query_vectors, top_k)
+
+        return [self._results(scores[row], idx[row]) for row in range(len(queries))]
@@ -0,0 +1,314 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import INGEST_MAX_CONCURRENT, INGEST_JOB_HISTORY
+from app.core.logger import logger
+from app.ingestion.process_pdf import process_pdf, resolve_manual_id
+from app.rag.utils.progress import bind_job, progress_tracker, update_progress
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobConflictError(Exception):
+    """A job for the same manual is already queued or running."""
+
+
+# ---------------------------------------------------------
+# Worker process entry point (must be importable for "spawn")
+# ---------------------------------------------------------
+def _ingest_worker(job_id: str, pdf_path: str, metadata: Optional[Dict[str, Any]], output_root: Optional[str], events):
+    # Own process group: the render / embedding pools this worker starts
+    # join it, so cancel() can stop all of them at once (see _terminate)
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+
+    # Progress events travel back to the API process through `events`
+    bind_job(job_id, events)
+    try:
+        process_pdf(pdf_path, metadata=metadata, output_root=output_root)
+    except Exception as e:
+        logger.error(f"[job {job_id}] Ingestion failed: {traceback.format_exc()}")
+        update_progress("error", error=str(e))
+        raise SystemExit(1)
+    finally:
+        # Flush queued progress events before the process exits
+        events.close()
+        events.join_thread()
+
+
+class IngestJob:
+    def __init__(self, pdf_path: str, metadata: Optional[Dict[str, Any]], output_root: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.pdf_path = pdf_path
+        self.metadata = metadata
+        self.output_root = output_root
+        self.manual_id = resolve_manual_id(pdf_path, metadata)
+
+        self.status = QUEUED
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+
+        self.process: multiprocessing.Process | None = None
+        self.cancel_requested = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "manual_id": self.manual_id,
+            "pdf": self.pdf_path,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": progress_tracker.snapshot(self.id),
+        }
+
+
+class IngestJobManager:
+    """
+    Runs ingestions in separate worker processes so rendering, OpenCV,
+    Gemini calls and embedding never block the API's event loop.
+
+    - submit() returns a job id immediately
+    - reserve(manual_id) fails fast on a conflicting job, before the
+      caller writes the manual's PDF into place
+    - at most max_concurrent worker processes run at once, the rest queue
+    - cancel() drops a queued job or terminates a running worker
+    - on_success(manual_id) runs in the API process when a job finishes
+      (used to refresh the manual registry)
+    - only the newest `history` finished jobs (and their progress) are kept
+    """
+
+    def __init__(self, max_concurrent: int = INGEST_MAX_CONCURRENT, history: int = INGEST_JOB_HISTORY):
+        self.history = history
+        self._jobs: Dict[str, IngestJob] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self._reserved: set = set()
+        # spawn: no forked copies of torch/fitz state, same behaviour on Windows
+        self._ctx = multiprocessing.get_context("spawn")
+
+    def _set_phase(self, job: IngestJob, phase: str, error: Optional[str] = None) -> None:
+        progress_tracker.apply({"job_id": job.id, "kind": "phase", "phase": phase, "error": error, "time": time.time()})
+
+    def submit(
+        self,
+        pdf_path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        output_root: Optional[str] = None,
+        on_success: Optional[Callable[[str], None]] = None,
+    ) -> IngestJob:
+        job = IngestJob(pdf_path, metadata, output_root)
+
+        with self._lock:
+            self._check_conflict(job.manual_id)
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._set_phase(job, QUEUED)
+
+        threading.Thread(target=self._run, args=(job, on_success), daemon=True).start()
+        logger.info(f"[job {job.id}] Queued ingestion of {pdf_path} as '{job.manual_id}'")
+        return job
+
+    def _check_conflict(self, manual_id: str) -> None:
+        """Caller holds self._lock."""
+        for other in self._jobs.values():
+            if other.manual_id == manual_id and other.status not in FINISHED:
+                raise JobConflictError(
+                    f"Manual '{manual_id}' is already being ingested (job {other.id})."
+                )
+
+    @contextmanager
+    def reserve(self, manual_id: str):
+        """
+        Hold manual_id while its PDF is written / moved into place, then
+        submit() inside the block. Raises JobConflictError (before any file
+        is touched) if a job or another reservation holds the manual.
+        """
+        with self._lock:
+            if manual_id in self._reserved:
+                raise JobConflictError(f"Manual '{manual_id}' is already being uploaded.")
+            self._check_conflict(manual_id)
+            self._reserved.add(manual_id)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._reserved.discard(manual_id)
+
+    def _run(self, job: IngestJob, on_success: Optional[Callable[[str], None]]):
+        with self._slots:
+            # One queue per job: terminating a worker can only break its own queue
+            events = self._ctx.Queue()
+
+            with self._lock:
+                if job.cancel_requested:
+                    return
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.process = self._ctx.Process(
+                    target=_ingest_worker,
+                    args=(job.id, job.pdf_path, job.metadata, job.output_root, events),
+                    name=f"ingest-{job.id[:8]}",
+                    # Not daemonic: the worker starts its own render/embedding
+                    # pools, which daemonic processes may not do.
+                    # shutdown() stops leftover workers and their pools instead.
+                    daemon=False,
+                )
+                job.process.start()
+
+            self._set_phase(job, RUNNING)
+            self._pump_events(job.process, events)
+            job.process.join()
+            # A crashed or terminated worker may leave pool children behind
+            self._kill_leftovers(job.process.pid)
+
+        with self._lock:
+            job.finished_at = time.time()
+            if job.cancel_requested:
+                job.status = CANCELLED
+            elif job.process.exitcode == 0:
+                job.status = SUCCEEDED
+            else:
+                job.status = FAILED
+                progress = progress_tracker.snapshot(job.id) or {}
+                job.error = progress.get("error") or f"Worker exited with code {job.process.exitcode}"
+            job.process = None
+
+        # Always end on a terminal phase: a worker that crashed or was killed
+        # never reported its own "error" phase
+        if job.status == FAILED:
+            self._set_phase(job, "error", error=job.error)
+        else:
+            self._set_phase(job, job.status)
+
+        with self._lock:
+            self._prune()
+
+        logger.info(f"[job {job.id}] {job.status}")
+
+        if job.status == SUCCEEDED and on_success is not None:
+            try:
+                on_success(job.manual_id)
+            except Exception as e:
+                logger.error(f"[job {job.id}] on_success failed: {e}")
+
+    def _prune(self) -> None:
+        """Drop the oldest finished jobs beyond self.history. Caller holds self._lock."""
+        finished = sorted(
+            (job for job in self._jobs.values() if job.status in FINISHED),
+            key=lambda job: job.finished_at or job.created_at,
+        )
+        stale = [job.id for job in finished[:max(0, len(finished) - self.history)]]
+        for job_id in stale:
+            del self._jobs[job_id]
+        progress_tracker.forget(stale)
+
+    @staticmethod
+    def _pump_events(process: multiprocessing.Process, events) -> None:
+        """Apply the worker's progress events to the tracker until it exits."""
+        while True:
+            try:
+                progress_tracker.apply(events.get(timeout=0.5))
+            except queue.Empty:
+                if not process.is_alive():
+                    break
+            except (EOFError, OSError):
+                # Worker was terminated mid-write
+                break
+
+    def cancel(self, job_id: str) -> IngestJob | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._set_phase(job, CANCELLED)
+            elif job.process is not None:
+                self._terminate(job.process)
+
+        logger.info(f"[job {job_id}] Cancellation requested")
+        return job
+
+    @staticmethod
+    def _terminate(process: multiprocessing.Process) -> None:
+        """
+        SIGTERM the worker and every process it started (its process
+        group): terminate() alone would leave its pool children running.
+        Without process groups (Windows) only the worker is stopped.
+        """
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                return
+            except (ProcessLookupError, PermissionError):
+                # Worker has not set up its group yet, so it has no children either
+                pass
+        process.terminate()
+
+    @staticmethod
+    def _kill_leftovers(pid: int) -> None:
+        """SIGKILL whatever is still in an exited worker's process group."""
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass  # group already empty
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Terminate running workers and their pool processes (called when the
+        API process stops). The runner threads are daemonic and die with the
+        API process, so the workers are joined and cleaned up here.
+        """
+        running = []
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == QUEUED:
+                    job.cancel_requested = True
+                elif job.process is not None:
+                    job.cancel_requested = True
+                    self._terminate(job.process)
+                    running.append(job.process)
+
+        deadline = time.monotonic() + timeout
+        for process in running:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+            self._kill_leftovers(process.pid)
+
+    def get(self, job_id: str) -> IngestJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+
+# Process-wide job manager used by /upload and /scrape
+job_manager = IngestJobManager()
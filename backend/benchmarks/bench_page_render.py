@@ -0,0 +1,50 @@
+"""
+Benchmark: render_pdf_to_images throughput vs number of worker processes.
+
+Renders the whole PDF at the ingestion DPI into a temp folder for each
+worker count and reports pages per second and speedup over 1 worker.
+
+Run from backend/:
+    python -m benchmarks.bench_page_render path/to/manual.pdf
+    python -m benchmarks.bench_page_render manual.pdf --workers 1 2 4 8 --dpi 200
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import fitz
+
+from app.ingestion.pipeline.page_renderer import render_pdf_to_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf")
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+
+    with fitz.open(args.pdf) as doc:
+        num_pages = len(doc)
+
+    print(f"{num_pages} pages, {cores} cores, {args.dpi} DPI")
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+
+    baseline = None
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as out_dir:
+            start = time.perf_counter()
+            render_pdf_to_images(args.pdf, out_dir, dpi=args.dpi, workers=workers)
+            elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {num_pages / elapsed:>9.1f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
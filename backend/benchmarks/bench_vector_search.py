@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: per-query cosine search cost in LocalVectorStore.
+
+Compares the old search path (row norms recomputed + full argsort on
+every query) with the current one (pre-normalized rows, one dot product,
+argpartition top-k) on random 384-d vectors.
+
+Run from backend/:
+    python -m benchmarks.bench_vector_search
+    python -m benchmarks.bench_vector_search --sizes 10000 100000 --queries 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+from numpy.linalg import norm
+
+from app.rag.embedding_store import l2_normalize
+from app.rag.vector_store import top_k_indices
+
+
+def search_old(embeddings: np.ndarray, q: np.ndarray, top_k: int):
+    sims = (embeddings @ q) / (norm(embeddings, axis=1) * norm(q))
+    return np.argsort(-sims)[:top_k]
+
+
+def search_new(embeddings_normalized: np.ndarray, q: np.ndarray, top_k: int):
+    sims = embeddings_normalized @ l2_normalize(q)
+    return top_k_indices(sims, top_k)
+
+
+def time_per_query(fn, embeddings, queries, top_k) -> float:
+    fn(embeddings, queries[0], top_k)  # warm-up
+    start = time.perf_counter()
+    for q in queries:
+        fn(embeddings, q, top_k)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)  # all-MiniLM-L6-v2
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print(f"{'chunks':>10} {'old ms/q':>10} {'new ms/q':>10} {'speedup':>8}  top-k match")
+    for n in args.sizes:
+        embeddings = rng.standard_normal((n, args.dim), dtype=np.float32)
+        normalized = l2_normalize(embeddings)
+
+        old = time_per_query(search_old, embeddings, queries, args.top_k)
+        new = time_per_query(search_new, normalized, queries, args.top_k)
+
+        same = all(
+            np.array_equal(search_old(embeddings, q, args.top_k), search_new(normalized, q, args.top_k))
+            for q in queries[:5]
+        )
+
+        print(f"{n:>10} {old * 1e3:>10.2f} {new * 1e3:>10.2f} {old / new:>7.1f}x  {same}")
+
+        del embeddings, normalized
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: memory, latency and recall@k of the VECTOR_STORAGE formats.
+
+Builds every compressed format for one embedding store, then runs the
+shipping search path (LocalVectorStore.search_many with that storage) and
+compares its top-k against exact float32 search, with re-ranking off and
+with VECTOR_RERANK candidates.
+
+By default a synthetic clustered corpus is generated (written to a temp
+folder); pass --manual to measure on a real processed manual. Queries are
+stored chunks with noise added, so each has real near neighbours; their
+vectors are passed in precomputed, so no embedding model is loaded.
+
+Run from backend/:
+    python -m benchmarks.bench_vector_storage
+    python -m benchmarks.bench_vector_storage --manual <manual_id> --top-k 5
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.paths import PROCESSED_DIR
+from app.rag.embedding_store import EmbeddingStoreWriter, LEGACY_JSON_FILE, load_binary_store, l2_normalize
+from app.rag.vector_compression import STORAGE_KINDS, build_compressed_vectors
+from app.rag.vector_store import LocalVectorStore, top_k_indices
+
+
+def synthetic_store(out_dir: Path, n: int, dim: int, seed: int = 0) -> None:
+    """Clustered unit vectors, closer to real embeddings than pure noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 50), dim), dtype=np.float32)
+    vectors = centers[rng.integers(len(centers), size=n)] + 0.6 * rng.standard_normal((n, dim), dtype=np.float32)
+
+    with EmbeddingStoreWriter(str(out_dir), model_name="synthetic") as store:
+        for start in range(0, n, 10000):
+            batch = vectors[start:start + 10000]
+            store.add([{"id": f"chunk_{start + i}", "text": "", "metadata": {}} for i in range(len(batch))], batch)
+
+
+def run_search(store_dir: Path, kind: str, rerank: int, queries: np.ndarray, top_k: int):
+    """LocalVectorStore.search_many with this storage → (row indices, ms per query, store)."""
+    store = LocalVectorStore(str(store_dir / LEGACY_JSON_FILE), storage=kind, rerank=rerank)
+    if store.index is not None:
+        print("⚠️ Ignoring the FAISS index: measuring the numpy / compressed path")
+        store.index = None
+
+    row_of = {chunk_id: row for row, chunk_id in enumerate(store.ids)}
+
+    start = time.perf_counter()
+    results = store.search_many([""] * len(queries), top_k, query_vectors=queries)
+    ms = (time.perf_counter() - start) / len(queries) * 1e3
+
+    found = np.array([[row_of[r["id"]] for r in per_query] for per_query in results])
+    return found, ms, store
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--manual", help="processed manual to measure instead of synthetic data")
+    parser.add_argument("--size", type=int, default=50_000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rerank", type=int, default=64, help="candidates re-scored exactly")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.manual:
+        store_dir = PROCESSED_DIR / args.manual
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        store_dir = Path(tmp.name)
+        synthetic_store(store_dir, args.size, args.dim)
+
+    embeddings, _, _ = load_binary_store(str(store_dir))
+    exact = np.asarray(embeddings, dtype=np.float32)
+
+    rng = np.random.default_rng(1)
+    picks = rng.integers(len(exact), size=args.queries)
+    queries = l2_normalize(exact[picks] + 0.05 * rng.standard_normal((args.queries, exact.shape[1]), dtype=np.float32))
+
+    truth = top_k_indices(queries @ exact.T, args.top_k)
+
+    print(f"{len(exact)} vectors x {exact.shape[1]}, {args.queries} queries, recall@{args.top_k}")
+    print(f"{'storage':>8} {'MB':>8} {'ratio':>6} {'ms/q':>7} {'recall':>7} {'+rerank':>8} {'ms/q':>7}")
+
+    for kind in STORAGE_KINDS:
+        build_compressed_vectors(str(store_dir), kind)
+
+        if kind == "float32":
+            found, ms, _ = run_search(store_dir, kind, 0, queries, args.top_k)
+            mb = exact.nbytes / 2**20
+            print(f"{kind:>8} {mb:>8.1f} {1.0:>5.1f}x {ms:>7.3f} {recall(found, truth):>7.3f} {'-':>8} {'-':>7}")
+            continue
+
+        found, ms, store = run_search(store_dir, kind, 0, queries, args.top_k)
+        reranked, rerank_ms, _ = run_search(store_dir, kind, args.rerank, queries, args.top_k)
+        mb = store.compressed.nbytes / 2**20
+
+        print(f"{kind:>8} {mb:>8.1f} {exact.nbytes / store.compressed.nbytes:>5.1f}x {ms:>7.3f} "
+              f"{recall(found, truth):>7.3f} {recall(reranked, truth):>8.3f} {rerank_ms:>7.3f}")
+
+    if args.manual:
+        # Leave the manual with the configured format
+        build_compressed_vectors(str(store_dir))
+    else:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
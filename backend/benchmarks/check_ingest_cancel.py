@@ -0,0 +1,101 @@
+"""
+Check: cancelling an ingestion job leaves no processes behind.
+
+Starts a real ingestion of a PDF through IngestJobManager with the render
+pool enabled, cancels it once the pool is running, and then verifies that
+the worker's process group (the worker and its render / embedding pool
+children) is empty. Exits non-zero if any process survives.
+
+POSIX only (process groups). Run from backend/:
+    python -m benchmarks.check_ingest_cancel path/to/manual.pdf
+"""
+
+import argparse
+import os
+import signal
+import sys
+import tempfile
+import time
+
+# Worker processes read their settings at import: force a render pool
+os.environ.setdefault("RENDER_WORKERS", "2")
+
+from app.rag.utils.progress import progress_tracker  # noqa: E402
+from app.services.ingest_jobs import FINISHED, RUNNING, IngestJobManager  # noqa: E402
+
+
+def group_alive(pgid: int) -> bool:
+    """
+    True if a live process is left in the group. Zombies are skipped: a
+    killed pool child stays one until its new parent (PID 1) reaps it,
+    and some container init processes never do.
+    """
+    if not os.path.isdir("/proc"):
+        try:
+            os.killpg(pgid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # "pid (comm) state ppid pgrp ..."; comm may contain spaces
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[2]) == pgid and fields[0] != "Z":
+            return True
+    return False
+
+
+def wait_for(predicate, timeout: float, interval: float = 0.2) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf", help="a manual large enough to use the render pool (8+ pages)")
+    parser.add_argument("--stage", default="render", help="cancel once this stage has started")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--grace", type=float, default=5.0, help="seconds allowed for teardown")
+    args = parser.parse_args()
+
+    if not hasattr(os, "killpg"):
+        sys.exit("Process groups are not available on this platform.")
+
+    manager = IngestJobManager(max_concurrent=1)
+    with tempfile.TemporaryDirectory() as output_root:
+        job = manager.submit(args.pdf, output_root=output_root)
+
+        started = wait_for(
+            lambda: args.stage in ((progress_tracker.snapshot(job.id) or {}).get("stages") or {}),
+            args.timeout,
+        )
+        if not started or job.status != RUNNING or job.process is None:
+            sys.exit(f"Job never reached stage '{args.stage}' (status {job.status}).")
+
+        pgid = job.process.pid
+        print(f"Cancelling job {job.id} during '{args.stage}' (worker pid {pgid})")
+        manager.cancel(job.id)
+
+        wait_for(lambda: job.status in FINISHED, args.timeout)
+        survived = wait_for(lambda: not group_alive(pgid), args.grace) is False
+
+        if survived:
+            os.killpg(pgid, signal.SIGKILL)
+            print(f"✗ Processes of job {job.id} survived the cancel")
+            sys.exit(1)
+
+        print(f"✓ Job {job.status}, no processes left in group {pgid}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Check: editing one page of a manual only changes that page's chunks.
+
+Builds the icon-enriched text (without icon tokens) of the PDF and of a
+copy with a line of text added to one page, chunks both the way
+build_knowledge does, and compares the chunk text hashes that the
+incremental ingest uses to reuse vectors. Exits non-zero if a chunk that
+needs embedding again does not come from the edited page.
+
+Run from backend/:
+    python -m benchmarks.check_page_chunks path/to/manual.pdf
+    python -m benchmarks.check_page_chunks manual.pdf --page 12
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from app.ingestion.pipeline.build_knowledge import generate_chunks_from_file
+from app.ingestion.pipeline.ingest_manifest import hash_text
+from app.ingestion.pipeline.text_icon_merger import PAGE_SEPARATOR, merge_icons_into_text
+
+
+def enriched_text(pdf_path: str, work_dir: Path, name: str) -> Path:
+    tokens_path = work_dir / "icon_tokens.json"
+    tokens_path.write_text(json.dumps([]), encoding="utf-8")
+
+    output_path = work_dir / f"{name}.txt"
+    merge_icons_into_text(pdf_path, str(tokens_path), str(output_path))
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf")
+    parser.add_argument("--page", type=int, default=None, help="1-based page to edit (default: middle page)")
+    parser.add_argument("--text", default="Edited: check the filter every 3 months.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+
+        doc = fitz.open(args.pdf)
+        page_number = args.page or len(doc) // 2 + 1
+        doc[page_number - 1].insert_text((72, 72), args.text, fontsize=11)
+        edited_pdf = work_dir / "edited.pdf"
+        doc.save(str(edited_pdf))
+        doc.close()
+
+        before_path = enriched_text(args.pdf, work_dir, "before")
+        after_path = enriched_text(str(edited_pdf), work_dir, "after")
+
+        before = {hash_text(chunk) for chunk in generate_chunks_from_file(str(before_path))}
+        after = list(generate_chunks_from_file(str(after_path)))
+        edited_page = after_path.read_text(encoding="utf-8").split(PAGE_SEPARATOR)[page_number - 1]
+
+    new = [chunk for chunk in after if hash_text(chunk) not in before]
+    stray = [chunk for chunk in new if chunk not in edited_page]
+
+    print(f"Edited page {page_number}: {len(after) - len(new)}/{len(after)} chunks reused, "
+          f"{len(new)} to embed again")
+
+    if not new:
+        sys.exit(f"✗ The edit on page {page_number} changed no chunk (page without text?)")
+    if stray:
+        print(f"✗ {len(stray)} re-embedded chunk(s) come from other pages, e.g.:\n{stray[0][:200]!r}")
+        sys.exit(1)
+
+    print(f"✓ Only chunks of page {page_number} need embedding again")
+
+
+if __name__ == "__main__":
+    main()
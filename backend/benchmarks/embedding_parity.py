@@ -0,0 +1,144 @@
+"""
+Parity + latency check for the embedding backends (EMBEDDING_BACKEND).
+
+Encodes the same texts with the fp32 torch model (reference) and with each
+requested backend, then reports the cosine agreement per text and the
+single-query encode latency. Exits non-zero if a backend's minimum cosine
+falls below --min-cosine.
+
+Also exports the ONNX model the "onnx" backend loads.
+
+Run from backend/:
+    python -m benchmarks.embedding_parity --export-onnx app/data/models/all-MiniLM-L6-v2-onnx
+    python -m benchmarks.embedding_parity --backends torch-int8 onnx
+    python -m benchmarks.embedding_parity --manual <manual_id> --texts 500
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import EMBEDDING_MODEL
+from app.core.paths import PROCESSED_DIR
+from app.rag.embedder import Embedder, EMBEDDING_BACKENDS
+from app.rag.embedding_store import CHUNKS_FILE, l2_normalize
+from app.rag.onnx_encoder import ONNX_MODEL_FILE
+
+SAMPLE_TEXTS = [
+    "How do I descale the coffee machine?",
+    "The red light is blinking after I filled the water tank.",
+    "Press and hold the power button for 3 seconds to reset the appliance.",
+    "Do not immerse the base unit in water or any other liquid.",
+    "Error E05 means the door is not closed properly.",
+    "Clean the filter every month to keep the airflow constant.",
+    "What does the snowflake icon on the display mean?",
+    "Use only original replacement parts from the manufacturer.",
+    "The child lock is activated by pressing START and TEMP together.",
+    "Remove the drip tray and empty the used coffee grounds container.",
+    "Installation must be carried out by a qualified electrician.",
+    "The appliance switches to standby mode after 15 minutes of inactivity.",
+]
+
+
+# ---------------------------------------------------------
+# ONNX EXPORT
+# ---------------------------------------------------------
+def export_onnx(model_name: str, out_dir: Path) -> None:
+    """Export the transformer of model_name (token embeddings output) + tokenizer.json."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hf_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(hf_name)
+    model = AutoModel.from_pretrained(hf_name).eval()
+
+    dummy = tokenizer(["export"], return_tensors="pt")
+    # Positional order of BertModel.forward
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+    dynamic = {n: {0: "batch", 1: "tokens"} for n in names + ["token_embeddings"]}
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[n] for n in names),
+            str(out_dir / ONNX_MODEL_FILE),
+            input_names=names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic,
+            opset_version=17,
+        )
+    tokenizer.save_pretrained(str(out_dir))  # writes tokenizer.json
+
+    print(f"Exported {hf_name} to {out_dir}")
+
+
+# ---------------------------------------------------------
+# PARITY
+# ---------------------------------------------------------
+def load_texts(manual_id: str | None, limit: int):
+    if manual_id is None:
+        return SAMPLE_TEXTS
+
+    with (PROCESSED_DIR / manual_id / CHUNKS_FILE).open("r", encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    return texts[:limit]
+
+
+def query_latency_ms(embedder: Embedder, texts, repeats: int = 3) -> float:
+    embedder.encode(texts[:1])  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            embedder.encode([text])
+    return (time.perf_counter() - start) / (repeats * len(texts)) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx"], choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--manual", help="use chunks of this processed manual instead of sample texts")
+    parser.add_argument("--texts", type=int, default=200, help="max chunks taken from --manual")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--export-onnx", type=Path, help="export the ONNX model to this folder and exit")
+    args = parser.parse_args()
+
+    if args.export_onnx:
+        export_onnx(args.model, args.export_onnx)
+        return
+
+    texts = load_texts(args.manual, args.texts)
+    latency_texts = texts[:20]
+
+    reference = Embedder(args.model, backend="torch")
+    ref_vectors = l2_normalize(reference.encode(texts))
+    ref_ms = query_latency_ms(reference, latency_texts)
+
+    print(f"{len(texts)} texts, model {args.model}")
+    print(f"{'backend':>12} {'min cos':>8} {'mean cos':>9} {'ms/query':>9} {'speedup':>8}")
+    print(f"{'torch':>12} {1.0:>8.4f} {1.0:>9.4f} {ref_ms:>9.2f} {1.0:>7.1f}x")
+
+    ok = True
+    for backend in args.backends:
+        if backend == "torch":
+            continue
+
+        embedder = Embedder(args.model, backend=backend)
+        cosines = np.sum(l2_normalize(embedder.encode(texts)) * ref_vectors, axis=1)
+        ms = query_latency_ms(embedder, latency_texts)
+
+        print(f"{backend:>12} {cosines.min():>8.4f} {cosines.mean():>9.4f} {ms:>9.2f} {ref_ms / ms:>7.1f}x")
+        ok &= bool(cosines.min() >= args.min_cosine)
+
+    if not ok:
+        print(f"✗ Cosine agreement below {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
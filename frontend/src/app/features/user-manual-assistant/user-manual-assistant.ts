@@ -1,6 +1,7 @@
 import {Component, OnInit, signal, WritableSignal} from '@angular/core';
 import {FormControl, FormsModule, ReactiveFormsModule} from '@angular/forms';
-import {AskService} from '../../../shared/services/ask.service';
+import {AskService, IngestJob, IngestJobResponse} from '../../../shared/services/ask.service';
+import {HttpErrorResponse} from '@angular/common/http';
 import {
     MatCard,
     MatCardContent,
@@ -75,27 +76,68 @@ export class UserManualAssistant implements OnInit {
         this.scrapeSpinner.set(true);
         this.scrapeStatus.set('Scraping...');
         this.askService.scrapeManual(this.selectedManualForm.value.url).subscribe({
-            next: (res: any) => {
+            next: (res) => {
                 console.log(res);
-                this.scrapeStatus.set(`✅`);
-                this.userManuals.set(res.results);
-                this.scrapeSpinner.set(false);
+                this.followIngestion(res, this.scrapeStatus, () => this.scrapeSpinner.set(false));
             },
             error: (err) => {
                 console.error('Error:', err);
                 this.scrapeSpinner.set(false);
-                this.scrapeStatus.set('❌ Scraping failed.');
+                this.scrapeStatus.set(this.requestErrorMessage(err, 'Scraping failed.'));
             },
         });
     }
 
+    /**
+     * The backend answers 202 + job_id: report ingestion progress in
+     * `status` until the job succeeds or fails, then call `finished`.
+     */
+    private followIngestion(res: IngestJobResponse, status: WritableSignal<string>, finished = () => {}) {
+        status.set(`⏳ ${res.message}`);
+        this.askService.watchIngestJob(res.job_id).subscribe({
+            next: (job: IngestJob) => {
+                if (job.status === 'succeeded') {
+                    status.set(`✅ Manual "${job.manual_id}" is ready.`);
+                } else if (job.status === 'failed') {
+                    status.set(`❌ Ingestion failed: ${job.error ?? 'unknown error'}`);
+                } else if (job.status === 'cancelled') {
+                    status.set('⚠️ Ingestion was cancelled.');
+                } else {
+                    const percent = job.progress?.progress ?? 0;
+                    status.set(`⏳ Processing "${job.manual_id}"... ${Math.round(percent)}%`);
+                }
+            },
+            complete: finished,
+            error: (err) => {
+                console.error(err);
+                status.set('❌ Lost track of the ingestion job.');
+                finished();
+            },
+        });
+    }
+
+    private requestErrorMessage(err: HttpErrorResponse, fallback: string): string {
+        // 409: this manual is already being ingested
+        if (err.status === 409 && err.error?.detail) {
+            return `⚠️ ${err.error.detail}`;
+        }
+        return `❌ ${fallback}`;
+    }
+
     onAsk() {
         this.askSpinner.set(true);
-        this.askService.askQuestion(this.questionForm.value).subscribe({
-            next: (res) => {
-                this.answer.set(res.answer);
-                console.log(this.answer);
-
+        this.answer.set('');
+        this.askService.askQuestionStream(this.questionForm.value).subscribe({
+            next: (message) => {
+                if (message.event === 'token') {
+                    // First token arrived: show text instead of the spinner
+                    this.askSpinner.set(false);
+                    this.answer.update((answer) => answer + message.data.text);
+                } else if (message.event === 'error') {
+                    this.answer.set(message.data.message);
+                }
+            },
+            complete: () => {
                 this.askSpinner.set(false);
             },
             error: (err) => {
@@ -123,11 +165,11 @@ export class UserManualAssistant implements OnInit {
         this.askService.uploadManual(this.selectedFile).subscribe({
             next: (res) => {
                 console.log(res);
-                this.uploadStatus.set(`✅ ${res.message}`);
+                this.followIngestion(res, this.uploadStatus);
             },
             error: (err) => {
                 console.error(err);
-                this.uploadStatus.set('❌ Upload failed.');
+                this.uploadStatus.set(this.requestErrorMessage(err, 'Upload failed.'));
             },
         });
     }
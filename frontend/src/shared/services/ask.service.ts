@@ -1,6 +1,27 @@
 import {Injectable} from '@angular/core';
 import {HttpClient} from '@angular/common/http';
-import {Observable} from 'rxjs';
+import {Observable, switchMap, takeWhile, timer} from 'rxjs';
+
+export interface IngestJobResponse {
+    message: string;
+    job_id: string;
+    manual_id: string;
+}
+
+export interface IngestJob {
+    job_id: string;
+    manual_id: string;
+    status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+    error: string | null;
+    progress: { phase: string; progress: number } | null;
+}
+
+const FINISHED_JOB_STATUSES = ['succeeded', 'failed', 'cancelled'];
+
+export interface AskStreamEvent {
+    event: 'chunks' | 'token' | 'done' | 'error';
+    data: any;
+}
 
 @Injectable({providedIn: 'root'})
 export class AskService {
@@ -13,21 +34,103 @@ export class AskService {
         return this.http.post<{ answer: string }>(`${this.apiUrl}/ask`, {question});
     }
 
+    /**
+     * POST /ask/stream and emit each server-sent event as it arrives
+     * (EventSource cannot POST, so the stream is read with fetch).
+     */
+    askQuestionStream(question: string): Observable<AskStreamEvent> {
+        return new Observable<AskStreamEvent>((subscriber) => {
+            const controller = new AbortController();
+
+            fetch(`${this.apiUrl}/ask/stream`, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({question}),
+                signal: controller.signal,
+            })
+                .then(async (response) => {
+                    if (!response.ok || !response.body) {
+                        throw new Error(`Stream request failed (${response.status})`);
+                    }
+
+                    const reader = response.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = '';
+
+                    while (true) {
+                        const {done, value} = await reader.read();
+                        if (done) {
+                            break;
+                        }
+
+                        buffer += decoder.decode(value, {stream: true});
+                        const rawEvents = buffer.split('\n\n');
+                        buffer = rawEvents.pop() ?? '';
+
+                        for (const rawEvent of rawEvents) {
+                            const parsed = this.parseServerSentEvent(rawEvent);
+                            if (parsed) {
+                                subscriber.next(parsed);
+                            }
+                        }
+                    }
+
+                    subscriber.complete();
+                })
+                .catch((err) => {
+                    if (err.name !== 'AbortError') {
+                        subscriber.error(err);
+                    }
+                });
+
+            return () => controller.abort();
+        });
+    }
+
+    private parseServerSentEvent(rawEvent: string): AskStreamEvent | null {
+        let event = '';
+        let data = '';
+
+        for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event:')) {
+                event = line.slice('event:'.length).trim();
+            } else if (line.startsWith('data:')) {
+                data += line.slice('data:'.length).trim();
+            }
+        }
+
+        if (!event) {
+            return null;
+        }
+        return {event: event as AskStreamEvent['event'], data: data ? JSON.parse(data) : null};
+    }
+
     searchManual(searchTerm: string) {
         return this.http.post<{ model: string }>(`${this.apiUrl}/search/manuals`, {model: searchTerm});
     }
 
     scrapeManual(manualUrl: string) {
-        return this.http.post<{ url: string }>(`${this.apiUrl}/scrape/manual`, {url: manualUrl});
+        return this.http.post<IngestJobResponse>(`${this.apiUrl}/scrape/manual`, {url: manualUrl});
     }
 
     uploadManual(file: File) {
         const formData = new FormData();
         formData.append('file', file);
-        return this.http.post<{ message: string }>(
+        return this.http.post<IngestJobResponse>(
             `${this.apiUrl}/upload`,
             formData
         );
     }
 
+    /**
+     * Poll GET /ingest/jobs/{id} until the job is finished; emits every
+     * state, the last one being succeeded / failed / cancelled.
+     */
+    watchIngestJob(jobId: string, intervalMs = 2000): Observable<IngestJob> {
+        return timer(0, intervalMs).pipe(
+            switchMap(() => this.http.get<IngestJob>(`${this.apiUrl}/ingest/jobs/${jobId}`)),
+            takeWhile((job) => !FINISHED_JOB_STATUSES.includes(job.status), true),
+        );
+    }
+
 }